@@ -11,3 +11,5 @@ CONSUMER_TOKEN_LIFETIME = getattr(settings, 'JWT_CONSUMER_TOKEN_LIFETIME', 14400
 USER_WEAK_TOKEN_LIFETIME = getattr(settings, 'JWT_USER_WEAK_TOKEN_LIFETIME', 2592000)
 USER_STRONG_TOKEN_LIFETIME = getattr(settings, 'JWT_USER_STRONG_TOKEN_LIFETIME', 3600)
 USER_LOGIN_ISSUE_WEAK_AND_STRONG_TOKEN = getattr(settings, 'JWT_USER_LOGIN_ISSUE_WEAK_AND_STRONG_TOKEN', True)
+CONSUMER_RATE_RULES_CACHE_TIMEOUT = getattr(settings, 'JWT_CONSUMER_RATE_RULES_CACHE_TIMEOUT', 60)
+CONSUMER_ALLOWED_ORIGINS_CACHE_TIMEOUT = getattr(settings, 'JWT_CONSUMER_ALLOWED_ORIGINS_CACHE_TIMEOUT', 60)
@@ -10,15 +10,14 @@ from django.core.exceptions import ObjectDoesNotExist
 from djsonrest.auth import Authentication
 from djsonrest import exceptions
 from . import app_settings
-from .models import Token
+from .models import Token, Consumer as ConsumerModel
+from .models.token import load_key
 
 
 _logger = logging.getLogger(__name__)
 
 
 class AbstractJWTAuthentication(Authentication):
-    __public_key = None
-
     audience = None
     public_key_file = app_settings.JWT_PUBLIC_KEY_FILE
     algorithm = app_settings.JWT_SIGNING_ALGORITHM
@@ -27,16 +26,16 @@ class AbstractJWTAuthentication(Authentication):
 
     @property
     def public_key(self):
-        if self.__public_key:
-            return self.__public_key
-
         if not self.public_key_file:
             raise exceptions.ConfigurationError('JWT Public Key not configured. Check your settings.')
 
-        with open(self.public_key_file) as file:
-            self.__public_key = file.read()
+        return load_key(self.public_key_file, self.algorithm)
 
-        return self.__public_key
+    def warmup(self):
+        self.public_key # pylint: disable=pointless-statement
+
+        if app_settings.JWT_PRIVATE_KEY_FILE:
+            Token._jwt_read_private_key() # pylint: disable=protected-access
 
     def authenticate(self, request):
         try:
@@ -77,6 +76,12 @@ class Consumer(AbstractJWTAuthentication):
     def authenticate(self, request):
         decoded_token = super().authenticate(request)
 
+        try:
+            # reject consumers exceeding their rate limits before any further work
+            ConsumerModel.check_rate_limits(decoded_token['sub'])
+        except KeyError as error:
+            raise exceptions.AuthenticationError from error
+
         try:
             token = Token.objects.get(id=decoded_token['jti'])
         except (ObjectDoesNotExist, KeyError) as error:
@@ -88,6 +93,12 @@ class Consumer(AbstractJWTAuthentication):
 
         return decoded_token
 
+    def allowed_origin(self, origin):
+        if origin in ConsumerModel.allowed_origins():
+            return origin
+
+        return None
+
     def response(self, request, response):
         try:
             response['Access-Control-Allow-Origin'] = request._rest_jwt_consumer_acao
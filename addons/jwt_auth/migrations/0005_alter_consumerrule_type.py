@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-18 21:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jwt_auth', '0004_auto_20200105_1345'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='consumerrule',
+            name='type',
+            field=models.CharField(choices=[('ip', 'IP Address'), ('http_access_control_origin', 'HTTP Access-Control-Origin'), ('rate', 'Rate Limit (requests/period, e.g. 100/m)')], max_length=32),
+        ),
+    ]
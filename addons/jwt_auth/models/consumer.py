@@ -3,20 +3,113 @@ This module contains Database Models which persistently store data used for auth
 """
 
 import uuid
+import logging
 import ipaddress
 from datetime import timedelta
-from django.db import models
+from django.db import models, transaction
+from django.db.models import signals
+from django.core.exceptions import ValidationError
 from django.contrib.auth.hashers import make_password, check_password
 from django.conf import settings
+from django.core.cache import cache
 from django.utils.functional import cached_property
 from django.utils import timezone
 
-from djsonrest import exceptions
+from djsonrest import exceptions, ratelimit
 from .token import Token
 from .. import app_settings
 
 
+_logger = logging.getLogger(__name__)
+
+
+def _rate_rules_cache_key(uid):
+    return 'djsonrest:jwt_auth:consumer_rate_rules:%s' % uid
+
+
+_ALLOWED_ORIGINS_CACHE_KEY = 'djsonrest:jwt_auth:consumer_allowed_origins'
+
+
+def _invalidate_rules(uids, using=None):
+    """ Remove the cached rules of the consumers `uids` once the transaction is committed """
+    keys = [_rate_rules_cache_key(uid) for uid in uids] + [_ALLOWED_ORIGINS_CACHE_KEY]
+    transaction.on_commit(lambda: cache.delete_many(keys), using=using)
+
+
+class RulesQuerySet(models.QuerySet):
+    """
+    Invalidates the cached rules on bulk updates, which do not send signals
+    (bulk deletes send post_delete for each instance)
+    """
+
+    consumer_field = None
+
+    def update(self, **kwargs):
+        uids = set(self.values_list(self.consumer_field, flat=True))
+        rows = super().update(**kwargs)
+        _invalidate_rules(uids, self.db)
+        return rows
+
+
+class ConsumerQuerySet(RulesQuerySet):
+    consumer_field = 'uid'
+
+
+class ConsumerRuleQuerySet(RulesQuerySet):
+    consumer_field = 'consumer_id'
+
+
 class Consumer(models.Model):
+    @classmethod
+    def rate_rules(cls, uid):
+        """
+        Returns the active rate limits of the consumer `uid`.
+        The rules are cached, so they can be checked before any other database work is done.
+        """
+        cache_key = _rate_rules_cache_key(uid)
+        rates = cache.get(cache_key)
+
+        if rates is None:
+            rates = []
+            for rate in ConsumerRule.objects.filter(consumer_id=uid, consumer__rules_active=True, type='rate').values_list('value', flat=True):
+                try:
+                    ratelimit.parse_rate(rate)
+                except ValueError:
+                    _logger.warning("Ignored invalid rate %r of consumer %s", rate, uid)
+                    continue
+
+                rates.append(rate)
+
+            cache.set(cache_key, rates, app_settings.CONSUMER_RATE_RULES_CACHE_TIMEOUT)
+
+        return rates
+
+    @classmethod
+    def check_rate_limits(cls, uid):
+        """
+        Count a request of the consumer `uid` against its rate limits.
+        Raises an exceptions.TooManyRequestsError when a limit is exceeded.
+        """
+        for rate in cls.rate_rules(uid):
+            ratelimit.check_rate('consumer:%s' % uid, rate)
+
+    @classmethod
+    def allowed_origins(cls):
+        """
+        Returns the origins allowed by the origin rules of all consumers with active rules.
+        The origins are cached, so CORS preflight requests are answered without database queries.
+        """
+        origins = cache.get(_ALLOWED_ORIGINS_CACHE_KEY)
+
+        if origins is None:
+            origins = frozenset(ConsumerRule.objects.filter(
+                consumer__rules_active=True,
+                type='http_access_control_origin',
+            ).values_list('value', flat=True))
+            cache.set(_ALLOWED_ORIGINS_CACHE_KEY, origins, app_settings.CONSUMER_ALLOWED_ORIGINS_CACHE_TIMEOUT)
+
+        return origins
+
     @classmethod
     def key_hash(cls, key):
         """
@@ -83,6 +176,8 @@ class Consumer(models.Model):
     def rule_types(self):
         return [rule['type'] for rule in self.rules.values('type').annotate(models.Count('pk'))]
 
+    objects = ConsumerQuerySet.as_manager()
+
     uid = models.UUIDField(primary_key=True, default=uuid.uuid4)
     key = models.CharField(max_length=128)
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='consumer', help_text='Requests will be performed using this user')
@@ -95,6 +190,7 @@ class ConsumerRule(models.Model):
     TYPES = (
         ('ip', 'IP Address'),
         ('http_access_control_origin', 'HTTP Access-Control-Origin'),
+        ('rate', 'Rate Limit (requests/period, e.g. 100/m)'),
     )
     ACTION_TYPES = (
         ('allow', 'Allow'),
@@ -108,7 +204,32 @@ class ConsumerRule(models.Model):
 
         return super().save(force_insert, force_update, using, update_fields)
 
+    def clean(self):
+        super().clean()
+
+        if self.type == 'rate':
+            try:
+                ratelimit.parse_rate(self.value)
+            except ValueError as error:
+                raise ValidationError({'value': ValidationError(str(error), code='invalid_rate')}) from error
+
+    objects = ConsumerRuleQuerySet.as_manager()
+
     consumer = models.ForeignKey(Consumer, on_delete=models.CASCADE, related_name='rules')
     type = models.CharField(max_length=32, choices=TYPES)
     value = models.CharField(max_length=255)
     action = models.CharField(max_length=6, choices=ACTION_TYPES)
+
+
+def _consumer_changed(sender, instance, using=None, **kwargs):
+    # rules_active decides whether the cached rules apply
+    _invalidate_rules([instance.uid], using)
+
+
+def _consumer_rule_changed(sender, instance, using=None, **kwargs):
+    _invalidate_rules([instance.consumer_id], using)
+
+
+for _signal in (signals.post_save, signals.post_delete):
+    _signal.connect(_consumer_changed, sender=Consumer, dispatch_uid='djsonrest.jwt_auth.consumer_rules')
+    _signal.connect(_consumer_rule_changed, sender=ConsumerRule, dispatch_uid='djsonrest.jwt_auth.consumer_rule_rules')
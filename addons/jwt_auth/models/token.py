@@ -1,20 +1,35 @@
 import time
-from jose import jwt
+from jose import jwt, jwk
 from django.db import models
 from djutils.crypt import random_string_generator
 
 from .. import app_settings
 
 
+_keys = {}
+
+
 def generate_token_id():
     return random_string_generator(size=64)
 
 
+def load_key(path: str, algorithm: str):
+    """ The key in the file `path`, read and parsed once per process """
+    try:
+        return _keys[path, algorithm]
+    except KeyError:
+        pass
+
+    with open(path, encoding='utf-8') as file:
+        key = _keys[path, algorithm] = jwk.construct(file.read(), algorithm)
+
+    return key
+
+
 class Token(models.Model):
     @classmethod
     def _jwt_read_private_key(cls):
-        with open(app_settings.JWT_PRIVATE_KEY_FILE) as key:
-            return key.read()
+        return load_key(app_settings.JWT_PRIVATE_KEY_FILE, app_settings.JWT_SIGNING_ALGORITHM)
 
     def _jwt_claims(self, expire=None, **claims):
         curr_time = time.time()
@@ -1,3 +1,74 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.test import TestCase, override_settings
+from django.urls import path
+from djsonrest import rest
+from .models import Consumer, ConsumerRule
 
-# Create your tests here.
+
+urlpatterns = [
+    path('api/', rest.routes.urls),
+]
+
+
+class ConsumerRateRulesTest(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user('consumer')
+        self.consumer = Consumer(user=user, rules_active=True)
+        self.consumer.set_key('secret')
+        self.consumer.save()
+
+    def add_rule(self, value):
+        with self.captureOnCommitCallbacks(execute=True):
+            return ConsumerRule.objects.create(consumer=self.consumer, type='rate', value=value, action='allow')
+
+    def test_invalidation(self):
+        rule = self.add_rule('5/m')
+        self.assertEqual(Consumer.rate_rules(self.consumer.uid), ['5/m'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ConsumerRule.objects.filter(pk=rule.pk).update(value='10/m')
+        self.assertEqual(Consumer.rate_rules(self.consumer.uid), ['10/m'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.consumer.rules_active = False
+            self.consumer.save()
+        self.assertEqual(Consumer.rate_rules(self.consumer.uid), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Consumer.objects.filter(pk=self.consumer.pk).update(rules_active=True)
+        self.assertEqual(Consumer.rate_rules(self.consumer.uid), ['10/m'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ConsumerRule.objects.filter(consumer=self.consumer).delete()
+        self.assertEqual(Consumer.rate_rules(self.consumer.uid), [])
+
+    def test_not_invalidated_before_commit(self):
+        self.add_rule('5/m')
+        self.assertEqual(Consumer.rate_rules(self.consumer.uid), ['5/m'])
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            ConsumerRule.objects.create(consumer=self.consumer, type='rate', value='100/h', action='allow')
+            self.assertEqual(Consumer.rate_rules(self.consumer.uid), ['5/m'])
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(sorted(Consumer.rate_rules(self.consumer.uid)), ['100/h', '5/m'])
+
+    def test_invalid_rate(self):
+        with self.assertRaises(ValidationError) as context:
+            ConsumerRule(consumer=self.consumer, type='rate', value='5 per minute', action='allow').full_clean()
+        self.assertIn('value', context.exception.message_dict)
+
+    @override_settings(ROOT_URLCONF=__name__)
+    def test_rate_limit_exceeded(self):
+        self.add_rule('2/h')
+        response = self.client.post('/api/1.0/auth/consumer', {'uid': str(self.consumer.uid), 'key': 'secret'}, content_type='application/json')
+        authorization = 'Bearer ' + response.json()['data']['token']
+
+        statuses = [self.client.get('/api/1.0/auth/consumer', HTTP_AUTHORIZATION=authorization).status_code for _ in range(2)]
+        self.assertEqual(statuses, [200, 200])
+
+        response = self.client.get('/api/1.0/auth/consumer', HTTP_AUTHORIZATION=authorization)
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
@@ -1,6 +1,8 @@
+import os
+import tempfile
 from django.conf import settings
-from djutils.http import error_respond_json
 from djutils.exceptions import Error
+from .errors import error_response
 
 
 class BadRequest(Error):
@@ -10,8 +12,58 @@ class BadRequest(Error):
 _bad_request = BadRequest(message="", code='bad_request')
 
 def route_not_found(request, *args, **kwargs):
-    return error_respond_json(_bad_request, status_code=400)
+    return error_response(_bad_request, status_code=400)
 
 
 VERSION_PREFIX = getattr(settings, "REST_VERSION_PREFIX", "")
 ROUTE_NOT_FOUND_VIEW = getattr(settings, "REST_ROUTE_NOT_FOUND_VIEW", route_not_found)
+MAX_BODY_SIZE = getattr(settings, "REST_MAX_BODY_SIZE", 10 * 1024 * 1024)
+MAX_COMPRESSION_RATIO = getattr(settings, "REST_MAX_COMPRESSION_RATIO", 100)
+MAX_BODY_DEPTH = getattr(settings, "REST_MAX_BODY_DEPTH", None)
+ROUTE_MANIFEST = getattr(settings, "REST_ROUTE_MANIFEST", None)
+ROUTE_MANIFEST_CHECK = getattr(settings, "REST_ROUTE_MANIFEST_CHECK", True)
+RATE_LIMIT_FILE = getattr(settings, "REST_RATE_LIMIT_FILE", os.path.join(tempfile.gettempdir(), "djsonrest-ratelimit"))
+RATE_LIMIT_SLOTS = getattr(settings, "REST_RATE_LIMIT_SLOTS", 65536)
+CONCURRENCY_RETRY_AFTER = getattr(settings, "REST_CONCURRENCY_RETRY_AFTER", 1)
+RESPONSE_CACHE = getattr(settings, "REST_RESPONSE_CACHE", "default")
+CACHE_REFRESH_WORKERS = getattr(settings, "REST_CACHE_REFRESH_WORKERS", 4)
+CORS_MAX_AGE = getattr(settings, "REST_CORS_MAX_AGE", 600)
+APPLICATION_PREFIX = getattr(settings, "REST_APPLICATION_PREFIX", "api/")
+APPLICATION_MIDDLEWARE = getattr(settings, "REST_APPLICATION_MIDDLEWARE", [
+    'djsonrest.middleware.RESTRoutesMiddleware',
+    'djsonrest.middleware.RESTRoutesAccessControlMiddleware',
+])
+PROFILE_DIR = getattr(settings, "REST_PROFILE_DIR", None)
+PROFILE_SAMPLE_RATE = getattr(settings, "REST_PROFILE_SAMPLE_RATE", 0.0)
+PROFILE_ROUTES = getattr(settings, "REST_PROFILE_ROUTES", {})
+PROFILE_HEADER = getattr(settings, "REST_PROFILE_HEADER", "X-Rest-Profile")
+PROFILE_PERMISSION = getattr(settings, "REST_PROFILE_PERMISSION", "djsonrest.profiling.is_privileged")
+PROFILE_MAX_FILES = getattr(settings, "REST_PROFILE_MAX_FILES", 100)
+QUERY_TRACKING_RATE = getattr(settings, "REST_QUERY_TRACKING_RATE", 0.0)
+QUERY_BUDGET = getattr(settings, "REST_QUERY_BUDGET", None)
+QUERY_REPEAT_THRESHOLD = getattr(settings, "REST_QUERY_REPEAT_THRESHOLD", 5)
+QUERY_REPORTER = getattr(settings, "REST_QUERY_REPORTER", "djsonrest.queries.log_report")
+LOG_ASYNC = getattr(settings, "REST_LOG_ASYNC", True)
+LOG_QUEUE_SIZE = getattr(settings, "REST_LOG_QUEUE_SIZE", 10000)
+ERROR_LOG_RATE = getattr(settings, "REST_ERROR_LOG_RATE", "10/m")
+ACCESS_LOG = getattr(settings, "REST_ACCESS_LOG", False)
+STREAM_MAX_ITEM_SIZE = getattr(settings, "REST_STREAM_MAX_ITEM_SIZE", 1024 * 1024)
+DB_PRIMARY = getattr(settings, "REST_DB_PRIMARY", "default")
+DB_REPLICAS = getattr(settings, "REST_DB_REPLICAS", [])
+DB_STICKY_SECONDS = getattr(settings, "REST_DB_STICKY_SECONDS", 5)
+DB_STICKY_COOKIE = getattr(settings, "REST_DB_STICKY_COOKIE", "rest_primary")
+DB_STICKY_HEADER = getattr(settings, "REST_DB_STICKY_HEADER", "X-Rest-Primary")
+WARMUP = getattr(settings, "REST_WARMUP", False)
+WARMUP_GC_FREEZE = getattr(settings, "REST_WARMUP_GC_FREEZE", False)
+WARMUP_HOOKS = getattr(settings, "REST_WARMUP_HOOKS", [])
+JOB_STORE = getattr(settings, "REST_JOB_STORE", "djsonrest.jobs.CacheJobStore")
+JOB_CACHE = getattr(settings, "REST_JOB_CACHE", "default")
+JOB_TIMEOUT = getattr(settings, "REST_JOB_TIMEOUT", 3600)
+JOB_WORKERS = getattr(settings, "REST_JOB_WORKERS", 4)
+JOB_MAX_QUEUED = getattr(settings, "REST_JOB_MAX_QUEUED", 100)
+JOB_POLL_INTERVAL = getattr(settings, "REST_JOB_POLL_INTERVAL", 1)
+IDEMPOTENCY_CACHE = getattr(settings, "REST_IDEMPOTENCY_CACHE", "default")
+IDEMPOTENCY_TIMEOUT = getattr(settings, "REST_IDEMPOTENCY_TIMEOUT", 86400)
+IDEMPOTENCY_MAX_SIZE = getattr(settings, "REST_IDEMPOTENCY_MAX_SIZE", 64 * 1024)
+IDEMPOTENCY_LOCK_TIMEOUT = getattr(settings, "REST_IDEMPOTENCY_LOCK_TIMEOUT", 60)
+IDEMPOTENCY_WAIT = getattr(settings, "REST_IDEMPOTENCY_WAIT", 10)
@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from . import app_settings, manifest
 
 
 class DJsonRestConfig(AppConfig):
@@ -7,4 +8,6 @@ class DJsonRestConfig(AppConfig):
 
     def ready(self):
         super().ready()
-        self.module.autodiscover()
+
+        if not (app_settings.ROUTE_MANIFEST and manifest.load(app_settings.ROUTE_MANIFEST, check=app_settings.ROUTE_MANIFEST_CHECK)):
+            self.module.autodiscover()
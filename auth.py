@@ -10,6 +10,21 @@ from . import exceptions
 _logger = logging.getLogger(__name__)
 
 
+def identity(request) -> str:
+    """
+    Identifies the authenticated client of a request: its consumer or user, or an empty string if anonymous
+    """
+    consumer = getattr(request, 'rest_consumer', None)
+    if consumer is not None:
+        return 'consumer:%s' % consumer.pk
+
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return 'user:%s' % user.pk
+
+    return ''
+
+
 class AuthenticationMeta(type):
     def __or__(cls, other):
         return HybridAuth(cls, other, operator="or")
@@ -47,6 +62,18 @@ class Authentication(metaclass=AuthenticationMeta):
         """
         return response
 
+    def allowed_origin(self, origin: str) -> str:
+        """
+        Returns the Access-Control-Allow-Origin for a CORS preflight request from `origin`,
+        or None to use the default. Preflight requests are not authenticated, so avoid database queries here.
+        """
+        return None
+
+    def warmup(self):
+        """
+        Load everything needed to authenticate requests (e.g. keys), called by djsonrest.warmup before the first request
+        """
+
 
 class Public(Authentication):
     def authenticate(self, request):
@@ -99,6 +126,18 @@ class HybridAuth(Authentication):
 
         raise exceptions.AuthenticationError
 
+    def allowed_origin(self, origin: str) -> str:
+        for auth in self.auth_methods:
+            allowed_origin = auth(self.rest_route).allowed_origin(origin)
+            if allowed_origin:
+                return allowed_origin
+
+        return None
+
+    def warmup(self):
+        for auth in self.auth_methods:
+            auth(self.rest_route).warmup()
+
     def response(self, request, response: HttpResponse) -> HttpResponse:
         if not self.auth_used:
             return response
@@ -0,0 +1,210 @@
+"""
+Replay of recorded traffic against the rest routes, used by the restbench management command.
+
+A traffic profile is a JSONL file with one request per line:
+
+    {"method": "GET", "path": "books", "version": "1.0", "auth": "Bearer ...", "body": null, "query": {"page": 2}}
+
+Only `path` is required; `method` defaults to GET and `version` to 1.0. `auth` is sent as Authorization header,
+`body` is encoded as json. Requests are grouped in the report by `name`, which defaults to method and path.
+"""
+
+import io
+import json
+import time
+import threading
+import contextlib
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.util import setup_testing_defaults
+from django.db import connections
+from . import app_settings
+
+
+class Entry:
+    """ A request of the traffic profile """
+
+    def __init__(self, path: str, method: str = "GET", version="1.0", auth: str = None, body=None, query: dict = None, headers: dict = None, name: str = None):
+        self.path = path.lstrip('/')
+        self.method = method.upper()
+        self.version = str(version)
+        self.auth = auth
+        self.body = json.dumps(body).encode() if body is not None else b''
+        self.query = urllib.parse.urlencode(query or {}, doseq=True)
+        self.headers = headers or {}
+        self.name = name or "%s %s" % (self.method, self.path)
+
+    def url_path(self, prefix: str) -> str:
+        return "/%s%s%s/%s" % (prefix, app_settings.VERSION_PREFIX, self.version, self.path)
+
+    def __str__(self):
+        return f"Entry({self.name})"
+
+    __repr__ = __str__
+
+
+def read_profile(path: str) -> list:
+    entries = []
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                entries.append(Entry(**json.loads(line)))
+
+    return entries
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class WSGITarget:
+    """ Sends the requests to a WSGI application in this process, counting the database queries """
+
+    counts_queries = True
+
+    def __init__(self, application, prefix: str):
+        self.application = application
+        self.prefix = prefix
+
+    def request(self, entry: Entry) -> tuple:
+        environ = {
+            'REQUEST_METHOD': entry.method,
+            'PATH_INFO': entry.url_path(self.prefix),
+            'QUERY_STRING': entry.query,
+            'CONTENT_LENGTH': str(len(entry.body)),
+            'CONTENT_TYPE': 'application/json',
+            'wsgi.input': io.BytesIO(entry.body),
+        }
+        if entry.auth:
+            environ['HTTP_AUTHORIZATION'] = entry.auth
+        for header, value in entry.headers.items():
+            environ['HTTP_' + header.upper().replace('-', '_')] = value
+        setup_testing_defaults(environ)
+
+        status = []
+        counter = _QueryCounter()
+        with contextlib.ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+
+            result = self.application(environ, lambda status_line, headers, exc_info=None: status.append(status_line))
+            try:
+                for _chunk in result:
+                    pass
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+
+        return int(status[0].split(' ', 1)[0]), counter.count
+
+
+class HTTPTarget:
+    """ Sends the requests to a (local) server """
+
+    counts_queries = False
+
+    def __init__(self, url: str, prefix: str):
+        self.url = url.rstrip('/')
+        self.prefix = prefix
+
+    def request(self, entry: Entry) -> tuple:
+        url = self.url + entry.url_path(self.prefix) + ('?' + entry.query if entry.query else '')
+        headers = dict(entry.headers, **{'Content-Type': 'application/json'})
+        if entry.auth:
+            headers['Authorization'] = entry.auth
+
+        http_request = urllib.request.Request(url, data=entry.body or None, headers=headers, method=entry.method)
+        try:
+            with urllib.request.urlopen(http_request) as response:
+                response.read()
+                return response.status, None
+        except urllib.error.HTTPError as error:
+            error.read()
+            return error.code, None
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """ Nearest-rank percentile of an already sorted list """
+    if not sorted_values:
+        return 0.0
+
+    return sorted_values[min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))]
+
+
+def _summary(samples: list, duration: float = None) -> dict:
+    latencies = sorted(sample[1] for sample in samples)
+    queries = [sample[2] for sample in samples if sample[2] is not None]
+    statuses = {}
+    for sample in samples:
+        statuses[sample[0]] = statuses.get(sample[0], 0) + 1
+
+    summary = {
+        'requests': len(samples),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'queries': sum(queries) if queries else None,
+        'queries_per_request': sum(queries) / len(queries) if queries else None,
+    }
+    if duration is not None:
+        summary['duration_s'] = duration
+        summary['requests_per_s'] = len(samples) / duration if duration else 0.0
+
+    return summary
+
+
+def run(target, entries: list, requests: int = None, concurrency: int = 1, warmup: int = 0) -> dict:
+    """
+    Replay the entries (cycling through them until `requests` requests are sent) using `concurrency` threads.
+    Returns the report containing the overall and per route throughput, latencies, statuses and query counts.
+    """
+    requests = requests or len(entries)
+    samples = []
+    lock = threading.Lock()
+    position = iter(range(requests))
+
+    for index in range(warmup):
+        target.request(entries[index % len(entries)])
+
+    def worker():
+        local_samples = []
+        try:
+            while True:
+                with lock:
+                    index = next(position, None)
+                if index is None:
+                    break
+
+                entry = entries[index % len(entries)]
+                start = time.perf_counter()
+                status, queries = target.request(entry)
+                local_samples.append((status, time.perf_counter() - start, queries, entry.name))
+        finally:
+            if target.counts_queries:
+                connections.close_all()
+
+        with lock:
+            samples.extend(local_samples)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    duration = time.perf_counter() - start
+
+    routes = {}
+    for sample in samples:
+        routes.setdefault(sample[3], []).append(sample)
+
+    report = _summary(samples, duration)
+    report['concurrency'] = concurrency
+    report['routes'] = {name: _summary(route_samples) for name, route_samples in sorted(routes.items())}
+    return report
@@ -0,0 +1,7 @@
+"""
+Micro benchmarks of djsonrest, run inside a configured django project, e.g.
+
+    DJANGO_SETTINGS_MODULE=project.settings python -m djsonrest.benchmarks.validation
+
+Use `python manage.py restbench` to benchmark the routes of a project with recorded traffic.
+"""
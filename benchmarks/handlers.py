@@ -0,0 +1,54 @@
+"""
+Requests to a rest route through the django WSGI application (settings.MIDDLEWARE) compared to the lean
+djsonrest.handlers application (settings.REST_APPLICATION_MIDDLEWARE).
+
+    python -m djsonrest.benchmarks.handlers [path] [number]
+
+The path defaults to the default route of version 1.0.
+"""
+
+import io
+import sys
+import time
+import django
+from django.core.handlers.wsgi import WSGIHandler
+
+
+def environ(path: str) -> dict:
+    return {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80',
+        'wsgi.input': io.BytesIO(b''),
+        'wsgi.url_scheme': 'http',
+    }
+
+
+def start_response(status, headers):
+    start_response.status = status
+
+
+def measure(application, path: str, number: int) -> float:
+    """ Seconds per request """
+    b''.join(application(environ(path), start_response))
+
+    start = time.perf_counter()
+    for _ in range(number):
+        b''.join(application(environ(path), start_response))
+
+    return (time.perf_counter() - start) / number
+
+
+def main(path: str = None, number: int = 5000):
+    from djsonrest import app_settings, handlers # pylint: disable=import-outside-toplevel
+
+    path = path or '/%s%s1.0/' % (handlers._path_prefix().lstrip('/'), app_settings.VERSION_PREFIX) # pylint: disable=protected-access
+    for name, application in (("django", WSGIHandler()), ("djsonrest lean", handlers.get_wsgi_application())):
+        seconds = measure(application, path, number)
+        print("%-16s %8.1f us per request (%s)" % (name, seconds * 1e6, start_response.status))
+
+
+if __name__ == '__main__':
+    django.setup()
+    main(*sys.argv[1:2], *map(int, sys.argv[2:3]))
@@ -0,0 +1,52 @@
+"""
+Compiled schemas (djsonrest.validation) compared to the equivalent hand-written checks using djsonrest.utils.
+"""
+
+import sys
+import timeit
+import django
+from djsonrest import exceptions, utils
+from djsonrest.validation import Field, compile_schema
+
+
+def hand_written(data: dict) -> dict:
+    utils.dict_require_keys(data, ('username', 'password'))
+    if not isinstance(data['password'], str) or len(data['password']) < 8:
+        raise exceptions.RequestError("Invalid password")
+    if 'age' in data and (data['age'].__class__ is not int or data['age'] < 0):
+        raise exceptions.RequestError("Invalid age")
+    if data.get('role', 'a') not in ('a', 'b'):
+        raise exceptions.RequestError("Invalid role")
+    if 'tags' in data and not all(isinstance(tag, str) for tag in data['tags']):
+        raise exceptions.RequestError("Invalid tags")
+    if not isinstance(data.get('address'), dict):
+        raise exceptions.RequestError("Invalid address")
+
+    utils.dict_require_keys(data['address'], ('zip',))
+    address = utils.dict_clean_others(data['address'], ('zip', 'city'))
+    result = utils.dict_clean_others(data, ('username', 'password', 'age', 'role', 'tags'))
+    result.setdefault('role', 'a')
+    result['address'] = address
+    return result
+
+
+def main(number: int = 200000):
+    compiled = compile_schema({
+        'username': str,
+        'password': Field(str, min_length=8),
+        'age': Field(int, required=False, min_value=0),
+        'role': Field(str, choices=('a', 'b'), required=False, default='a'),
+        'tags': Field(list, items=str, required=False),
+        'address': {'zip': str, 'city': Field(str, null=True)},
+    })
+    data = {'username': 'bob', 'password': 'secret123', 'age': 4, 'tags': ['x'], 'address': {'zip': '1', 'city': None}, 'other': 1}
+    assert compiled(data) == hand_written(data)
+
+    for name, function in (("compiled schema", compiled), ("hand-written", hand_written)):
+        seconds = min(timeit.repeat(lambda function=function: function(data), number=number, repeat=3))
+        print("%-16s %6.2f us per call" % (name, seconds / number * 1e6))
+
+
+if __name__ == '__main__':
+    django.setup()
+    main(*map(int, sys.argv[1:]))
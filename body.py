@@ -0,0 +1,407 @@
+"""
+Lazy, size-limited parsing of json request bodies.
+
+Bulk routes can stream the body instead: the items of a json array or of newline delimited json (NDJSON)
+are parsed incrementally while the request is read, so the memory usage does not depend on the size of the body.
+"""
+
+import json
+import re
+import zlib
+import codecs
+from itertools import islice
+from . import exceptions, app_settings
+
+
+STREAM_CHUNK_SIZE = 64 * 1024
+NDJSON_CONTENT_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/json-seq')
+
+DECOMPRESSORS = {
+    'gzip': lambda: zlib.decompressobj(16 + zlib.MAX_WBITS),
+    'x-gzip': lambda: zlib.decompressobj(16 + zlib.MAX_WBITS),
+    'deflate': lambda: zlib.decompressobj(zlib.MAX_WBITS),
+}
+
+# json strings (which may contain brackets) or a single bracket
+_nesting_tokens = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"|[\[\]{}]')
+
+
+def content_length(request):
+    """
+    Returns the announced length of the request body from the `Content-Length` header or None if it is not set.
+    """
+    try:
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError as error:
+        raise exceptions.RequestError("Invalid Content-Length") from error
+
+    if length < 0:
+        raise exceptions.RequestError("Invalid Content-Length")
+
+    return length or None
+
+
+def check_content_length(request, max_size: int = None):
+    """
+    Reject the request if the announced body size exceeds `max_size`, before anything of the body is read.
+    """
+    if max_size is None:
+        return
+
+    length = content_length(request)
+    if length and length > max_size:
+        raise exceptions.PayloadTooLargeError("Request body too large", code='body_too_large')
+
+
+def _expanded_limit(compressed_size: int, max_size: int = None) -> int:
+    """
+    The maximum decompressed size of a compressed body: `max_size`, and at most settings.REST_MAX_COMPRESSION_RATIO
+    times the compressed size (never less than one chunk), so small bodies can not expand to huge ones
+    """
+    ratio = app_settings.MAX_COMPRESSION_RATIO
+    if ratio is None:
+        return max_size
+
+    limit = max(compressed_size * ratio, STREAM_CHUNK_SIZE)
+    return limit if max_size is None else min(limit, max_size)
+
+
+def read_body(request, max_size: int = None) -> bytes:
+    """
+    Read the request body and decompress it according to the `Content-Encoding` header.
+    The decompressed body may not exceed `max_size` nor the maximum compression ratio.
+    """
+    encoding = request.META.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+    body = request.body
+
+    if encoding in ('', 'identity'):
+        if max_size is not None and len(body) > max_size:
+            raise exceptions.PayloadTooLargeError("Request body too large", code='body_too_large')
+
+        return body
+
+    try:
+        decompressor = DECOMPRESSORS[encoding]()
+    except KeyError as error:
+        raise exceptions.UnsupportedMediaTypeError("Unsupported Content-Encoding", code='unsupported_encoding') from error
+
+    limit = _expanded_limit(len(body), max_size)
+    try:
+        data = decompressor.decompress(body, limit + 1 if limit is not None else 0)
+    except zlib.error as error:
+        raise exceptions.EncodingError("Invalid compressed request body") from error
+
+    if limit is not None and len(data) > limit:
+        raise exceptions.PayloadTooLargeError("Request body too large", code='body_too_large')
+
+    if not decompressor.eof:
+        raise exceptions.EncodingError("Incomplete compressed request body")
+
+    return data
+
+
+def check_depth(data: bytes, max_depth: int):
+    """
+    Reject json documents nested deeper than `max_depth` without parsing them.
+    """
+    depth = 0
+    for match in _nesting_tokens.finditer(data):
+        token = match.group()
+        if token in (b'[', b'{'):
+            depth += 1
+            if depth > max_depth:
+                raise exceptions.RequestError("Request body nested too deeply", code='body_too_deep')
+
+        elif token in (b']', b'}'):
+            depth -= 1
+
+
+def parse_body(request, max_size: int = None, max_depth: int = None):
+    """
+    Read, decompress and decode the json request body (encoding is fixed to UTF-8).
+    An empty body results in an empty dict.
+    """
+    data = read_body(request, max_size)
+    if not data:
+        return {}
+
+    if max_depth is not None:
+        check_depth(data, max_depth)
+
+    try:
+        return json.loads(data.decode('utf-8'))
+
+    except json.JSONDecodeError as error:
+        raise exceptions.EncodingError(error.args[0]) from error
+
+    except UnicodeDecodeError as error:
+        raise exceptions.EncodingError("Request body is not UTF-8 encoded") from error
+
+    except RecursionError as error:
+        raise exceptions.RequestError("Request body nested too deeply", code='body_too_deep') from error
+
+
+class LazyJSON:
+    """
+    Descriptor of request.JSON, parsing the request body on its first access; the parsed data is stored in the request
+    """
+
+    def __get__(self, request, owner):
+        if request is None:
+            return self
+
+        try:
+            return request.__dict__['JSON']
+        except KeyError:
+            pass
+
+        data = request.__dict__['JSON'] = parse_body(request, *request.rest_body_limits)
+        return data
+
+    def __set__(self, request, value):
+        request.__dict__['JSON'] = value
+
+
+_lazy_request_classes = {}
+
+
+def lazy_body(request, max_size: int = None, max_depth: int = None):
+    """
+    Make request.JSON parse the request body on its first access.
+    """
+    request.rest_body_limits = (max_size, max_depth)
+    request.__dict__.pop('JSON', None)
+
+    request_class = request.__class__
+    if isinstance(request_class.__dict__.get('JSON'), LazyJSON):
+        return
+
+    try:
+        request.__class__ = _lazy_request_classes[request_class]
+    except KeyError:
+        lazy_class = type(request_class.__name__, (request_class,), {'JSON': LazyJSON(), '__module__': request_class.__module__})
+        request.__class__ = _lazy_request_classes.setdefault(request_class, lazy_class)
+
+
+def iter_body(request, max_size: int = None, chunk_size: int = STREAM_CHUNK_SIZE):
+    """
+    Read the request body from the request stream in chunks and decompress it according to the `Content-Encoding` header.
+    The decompressed body may not exceed `max_size` nor the maximum compression ratio.
+    """
+    encoding = request.META.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+    if encoding in ('', 'identity'):
+        decompressor = None
+    else:
+        try:
+            decompressor = DECOMPRESSORS[encoding]()
+        except KeyError as error:
+            raise exceptions.UnsupportedMediaTypeError("Unsupported Content-Encoding", code='unsupported_encoding') from error
+
+    size = 0
+    limit = max_size
+    compressed_size = 0
+    while True:
+        data = request.read(chunk_size)
+        if not data:
+            break
+
+        if decompressor:
+            compressed_size += len(data)
+            limit = _expanded_limit(compressed_size, max_size)
+
+        while data:
+            if decompressor:
+                try:
+                    chunk = decompressor.decompress(data, chunk_size)
+                except zlib.error as error:
+                    raise exceptions.EncodingError("Invalid compressed request body") from error
+
+                data = decompressor.unconsumed_tail
+            else:
+                chunk, data = data, b''
+
+            size += len(chunk)
+            if limit is not None and size > limit:
+                raise exceptions.PayloadTooLargeError("Request body too large", code='body_too_large')
+
+            if chunk:
+                yield chunk
+
+    if decompressor and not decompressor.eof:
+        raise exceptions.EncodingError("Incomplete compressed request body")
+
+
+def _decode(chunks):
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        for chunk in chunks:
+            text = decoder.decode(chunk)
+            if text:
+                yield text
+
+        decoder.decode(b'', final=True)
+
+    except UnicodeDecodeError as error:
+        raise exceptions.EncodingError("Request body is not UTF-8 encoded") from error
+
+
+def _load_item(text: str, max_depth: int):
+    if max_depth is not None:
+        check_depth(text.encode('utf-8'), max_depth)
+
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as error:
+        raise exceptions.EncodingError(error.args[0]) from error
+    except RecursionError as error:
+        raise exceptions.RequestError("Request body nested too deeply", code='body_too_deep') from error
+
+
+def _check_item_size(buffer: str, max_item_size: int):
+    if len(buffer) > max_item_size:
+        raise exceptions.PayloadTooLargeError("Request body item too large", code='item_too_large')
+
+
+def iter_ndjson(chunks, max_depth: int = None, max_item_size: int = None):
+    """
+    Parse newline delimited json, yielding the item of each non-empty line
+    """
+    max_item_size = max_item_size or app_settings.STREAM_MAX_ITEM_SIZE
+    buffer = ''
+    for text in _decode(chunks):
+        buffer += text
+        lines = buffer.split('\n')
+        buffer = lines.pop()
+        _check_item_size(buffer, max_item_size)
+
+        for line in lines:
+            line = line.strip().lstrip('\x1e')  # record separators of application/json-seq
+            if line:
+                yield _load_item(line, max_depth)
+
+    buffer = buffer.strip().lstrip('\x1e')
+    if buffer:
+        yield _load_item(buffer, max_depth)
+
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r'[ \t\n\r]*')
+
+
+def iter_json_array(chunks, max_depth: int = None, max_item_size: int = None):
+    """
+    Parse a json array incrementally, yielding its items
+    """
+    max_item_size = max_item_size or app_settings.STREAM_MAX_ITEM_SIZE
+    texts = _decode(chunks)
+    buffer = ''
+    position = 0
+    started = expect_separator = expect_item = False
+
+    def fill():
+        nonlocal buffer, position
+        try:
+            buffer = buffer[position:] + next(texts)
+        except StopIteration:
+            return False
+
+        position = 0
+        return True
+
+    while True:
+        position = _whitespace.match(buffer, position).end()
+        if position == len(buffer):
+            if not fill():
+                raise exceptions.EncodingError("Incomplete json array in request body")
+            continue
+
+        char = buffer[position]
+        if not started:
+            if char != '[':
+                raise exceptions.RequestError("Request body has to be a json array", code='invalid_type')
+
+            started = True
+            position += 1
+            continue
+
+        if char == ']':
+            if expect_item:
+                raise exceptions.EncodingError("Expected an item after ',' in the json array of the request body")
+
+            if buffer[position + 1:].strip() or any(text.strip() for text in texts):
+                raise exceptions.EncodingError("Extra data after the json array in request body")
+
+            return
+
+        if expect_separator:
+            if char != ',':
+                raise exceptions.EncodingError("Expected ',' or ']' in the json array of the request body")
+
+            position += 1
+            expect_separator = False
+            expect_item = True
+            continue
+
+        try:
+            item, end = _decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError as error:
+            # the item may be incomplete, read more of the body
+            _check_item_size(buffer[position:], max_item_size)
+            if not fill():
+                raise exceptions.EncodingError(error.args[0]) from error
+            continue
+
+        following = _whitespace.match(buffer, end).end()
+        if (following == len(buffer) or buffer[following] not in ',]') and fill():
+            # the item may continue in the next chunk (e.g. a number), decode it again once its end is known
+            continue
+
+        _check_item_size(buffer[position:end], max_item_size)
+        if max_depth is not None:
+            check_depth(buffer[position:end].encode('utf-8'), max_depth)
+
+        position = end
+        expect_separator = True
+        expect_item = False
+        yield item
+
+
+def stream_body(request, max_size: int = None, max_depth: int = None):
+    """
+    Returns an iterator of the items of the request body, which is parsed incrementally while it is read:
+    newline delimited json for `application/x-ndjson` (and similar) content types, otherwise a json array.
+    `max_depth` applies to each item.
+    """
+    chunks = iter_body(request, max_size)
+    if request.content_type in NDJSON_CONTENT_TYPES:
+        return iter_ndjson(chunks, max_depth)
+
+    return iter_json_array(chunks, max_depth)
+
+
+def batches(items, size: int):
+    """
+    Split an iterator of items into lists of at most `size` items
+    """
+    items = iter(items)
+    while True:
+        batch = list(islice(items, size))
+        if not batch:
+            return
+
+        yield batch
+
+
+def bulk_create(model, items, batch_size: int = 1000, **kwargs) -> int:
+    """
+    Create instances of `model` from an iterator of items (dicts of field values or model instances)
+    using one bulk_create query per `batch_size` items, without loading all items into memory.
+    Returns the number of created instances.
+    """
+    count = 0
+    for batch in batches(items, batch_size):
+        objs = [item if isinstance(item, model) else model(**item) for item in batch]
+        model._default_manager.bulk_create(objs, batch_size=batch_size, **kwargs)
+        count += len(objs)
+
+    return count
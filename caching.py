@@ -0,0 +1,321 @@
+"""
+Caching of encoded route responses, including serving stale responses while revalidating
+in the background (stale-while-revalidate) and when the route function fails (stale-if-error).
+
+Cached responses and ETags can depend on cache tags. Each tag has a generation counter in the cache,
+which is part of the cache keys and ETags; incrementing it invalidates all responses depending on the tag.
+
+`QuerySetValidators` derives ETag and Last-Modified of a route from a single aggregate query.
+"""
+
+import copy
+import time
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.core import exceptions as django_exceptions
+from django.core.cache import caches
+from django.db import connections, transaction
+from django.db.models import signals, Count, Max, Sum, IntegerField
+from django.http.response import HttpResponse
+from django.utils.http import http_date
+from . import app_settings, exceptions
+from .coalescing import snapshot_response, response_from_snapshot
+
+
+_logger = logging.getLogger(__name__)
+
+# errors answered with a client error response; a stale response is not a substitute for them
+CLIENT_ERRORS = (
+    exceptions.Error,
+    django_exceptions.ObjectDoesNotExist,
+    django_exceptions.FieldDoesNotExist,
+    django_exceptions.ValidationError,
+    django_exceptions.SuspiciousOperation,
+    django_exceptions.PermissionDenied,
+)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def executor() -> ThreadPoolExecutor:
+    """ The thread pool used to refresh stale responses, created on first use """
+    global _executor # pylint: disable=global-statement
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=app_settings.CACHE_REFRESH_WORKERS, thread_name_prefix='djsonrest-refresh')
+
+    return _executor
+
+
+class ResponseCache:
+    """
+    Stores the encoded responses of a route in the django cache configured by settings.REST_RESPONSE_CACHE.
+
+    A stored response is fresh for `timeout` seconds. Afterwards, during `stale_while_revalidate` seconds, it is still
+    returned immediately while a background task refreshes it. During `stale_if_error` seconds after it expired,
+    it is returned if the route function fails with an unexpected (server) error; `CLIENT_ERRORS` and the
+    `handled_exceptions` of the route are raised.
+    """
+
+    def __init__(self, name: str, timeout: int, stale_while_revalidate: int = None, stale_if_error: int = None, handled_exceptions: tuple = ()):
+        self.name = name
+        self.expected_errors = CLIENT_ERRORS + tuple(handled_exceptions)
+        self.timeout = timeout
+        self.stale_while_revalidate = stale_while_revalidate or 0
+        self.stale_if_error = stale_if_error or 0
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    @property
+    def store(self):
+        return caches[app_settings.RESPONSE_CACHE]
+
+    def cache_key(self, request_key) -> str:
+        return 'djsonrest:response:%s' % hashlib.sha1(repr((self.name, request_key)).encode()).hexdigest()
+
+    def get(self, request, request_key, compute: callable) -> HttpResponse:
+        """
+        Returns the stored response for `request_key` or computes it using `compute(request)`
+        """
+        cache_key = self.cache_key(request_key)
+        entry = self.store.get(cache_key)
+        age = None
+
+        if entry:
+            stored_at, snapshot = entry
+            age = time.time() - stored_at
+
+            if age < self.timeout:
+                return response_from_snapshot(snapshot)
+
+            if age < self.timeout + self.stale_while_revalidate:
+                self.refresh(cache_key, request, compute)
+                return response_from_snapshot(snapshot)
+
+        try:
+            response = compute(request)
+
+        except self.expected_errors:
+            raise
+
+        except Exception: # pylint: disable=broad-except
+            if entry and age < self.timeout + self.stale_if_error:
+                _logger.warning("Serving stale response of %s after an error", self.name, exc_info=True)
+                return response_from_snapshot(snapshot)
+
+            raise
+
+        self.set(cache_key, response)
+        return response
+
+    def set(self, cache_key: str, response: HttpResponse):
+        if not 200 <= response.status_code < 300 or response.streaming:
+            return
+
+        self.store.set(
+            cache_key,
+            (time.time(), snapshot_response(response)),
+            self.timeout + max(self.stale_while_revalidate, self.stale_if_error),
+        )
+
+    def refresh(self, cache_key: str, request, compute: callable):
+        """
+        Recompute the response in the background, unless a refresh of it is already running
+        """
+        with self._lock:
+            if cache_key in self._refreshing:
+                return
+
+            self._refreshing.add(cache_key)
+
+        executor().submit(self._refresh, cache_key, copy.copy(request), compute)
+
+    def _refresh(self, cache_key: str, request, compute: callable):
+        try:
+            self.set(cache_key, compute(request))
+
+        except Exception: # pylint: disable=broad-except
+            _logger.exception("Refreshing the stale response of %s failed", self.name)
+
+        finally:
+            with self._lock:
+                self._refreshing.discard(cache_key)
+
+            connections.close_all()
+
+    def __str__(self):
+        return f"ResponseCache({self.name}, timeout={self.timeout})"
+
+    __repr__ = __str__
+
+
+class _AttributeGetter:
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __getitem__(self, key):
+        return getattr(self.obj, key)
+
+
+def _tag_key(tag: str) -> str:
+    return 'djsonrest:tag:%s' % tag
+
+
+def generations(tags) -> tuple:
+    """
+    Returns the current generation counters of the cache tags, using a single cache lookup.
+    Counters which do not exist yet are initialized with the current time, so an evicted counter never
+    returns to a generation which was used before.
+    """
+    store = caches[app_settings.RESPONSE_CACHE]
+    keys = [_tag_key(tag) for tag in tags]
+    current = store.get_many(keys)
+
+    for key in keys:
+        if key not in current:
+            store.add(key, time.time_ns(), None)
+            current[key] = store.get(key)
+
+    return tuple(current[key] for key in keys)
+
+
+def invalidate(*tags):
+    """
+    Invalidate all cached responses and ETags of routes depending on one of the given cache tags
+    by incrementing the tags generation counters.
+    """
+    store = caches[app_settings.RESPONSE_CACHE]
+    for tag in tags:
+        key = _tag_key(tag)
+        try:
+            store.incr(key)
+        except ValueError:
+            store.add(key, time.time_ns(), None)
+
+
+class CacheTags:
+    """
+    The cache tags of a route: strings, which are formatted using the url arguments of the route (e.g. 'book:{id}'),
+    or a callable taking the request and the url arguments and returning the tags.
+    """
+
+    def __init__(self, tags):
+        self.tags = tags
+
+    def resolve(self, request, *args, **kwargs) -> list:
+        if callable(self.tags):
+            return list(self.tags(request, *args, **kwargs))
+
+        return [tag.format(*args, **kwargs) for tag in self.tags]
+
+    def generations(self, request, *args, **kwargs) -> tuple:
+        return generations(self.resolve(request, *args, **kwargs))
+
+    def __str__(self):
+        return f"CacheTags({self.tags})"
+
+    __repr__ = __str__
+
+
+def etag(name: str, request_key, tag_generations: tuple) -> str:
+    """ An ETag which changes when one of the tags of the response is invalidated """
+    return '"%s"' % hashlib.sha1(repr((name, request_key, tag_generations)).encode()).hexdigest()
+
+
+class QuerySetValidators:
+    """
+    A cache function for GET routes (`cache=...`), deriving the ETag and Last-Modified header from a single
+    aggregate query over a QuerySet: its count, the sum of the primary keys (for integer keys) and the maximum of
+    `updated_field`. Pass None as `updated_field` if the model has no modification timestamp.
+
+    `queryset` may be a callable taking the arguments of the cache function (the request and the url arguments)
+    and returning the QuerySet:
+
+        @rest.get('/books', version=1.0, cache=caching.QuerySetValidators(Book.objects.all()))
+        def books_get(request):
+            ...
+    """
+
+    def __init__(self, queryset, updated_field: str = 'updated_at', etag: bool = True, last_modified: bool = True):
+        self.queryset = queryset
+        self.updated_field = updated_field
+        self.etag = etag
+        self.last_modified = last_modified and bool(updated_field)
+
+    def get_queryset(self, *args, **kwargs):
+        if callable(self.queryset):
+            return self.queryset(*args, **kwargs)
+
+        return self.queryset.all()
+
+    def aggregates(self, queryset) -> dict:
+        aggregates = {'count': Count('pk')}
+        if isinstance(queryset.model._meta.pk, IntegerField):
+            aggregates['pk_sum'] = Sum('pk')
+        if self.updated_field:
+            aggregates['updated'] = Max(self.updated_field)
+
+        return queryset.order_by().aggregate(**aggregates)
+
+    def __call__(self, *args, **kwargs) -> HttpResponse:
+        values = self.aggregates(self.get_queryset(*args, **kwargs))
+        response = HttpResponse()
+
+        if self.etag:
+            response['ETag'] = '"%s"' % hashlib.sha1(repr(sorted(values.items())).encode()).hexdigest()
+
+        if self.last_modified and values['updated'] is not None:
+            response['Last-Modified'] = http_date(values['updated'].timestamp())
+
+        return response
+
+    def __str__(self):
+        source = self.queryset.model.__name__ if hasattr(self.queryset, 'model') else getattr(self.queryset, '__qualname__', self.queryset)
+        return f"QuerySetValidators({source}, updated_field={self.updated_field})"
+
+    __repr__ = __str__
+
+
+def invalidate_on(model, *tags):
+    """
+    Invalidate the cache tags when an instance of `model` is saved or deleted (after the transaction is committed).
+    Tags are strings, which are formatted using the attributes of the instance (e.g. 'book:{pk}'),
+    or callables taking the instance and returning a list of tags.
+    """
+    def instance_tags(instance):
+        resolved = []
+        for tag in tags:
+            if callable(tag):
+                resolved += tag(instance)
+            else:
+                resolved.append(tag.format_map(_AttributeGetter(instance)))
+
+        return resolved
+
+    def receiver(sender, instance, **kwargs):
+        resolved = instance_tags(instance)
+        transaction.on_commit(lambda: invalidate(*resolved), using=kwargs.get('using'))
+
+    uid = 'djsonrest.caching.invalidate_on:%s.%s:%r' % (model._meta.app_label, model.__name__, tags)
+    signals.post_save.connect(receiver, sender=model, weak=False, dispatch_uid=uid)
+    signals.post_delete.connect(receiver, sender=model, weak=False, dispatch_uid=uid)
+
+
+def invalidates(*tags):
+    """
+    Class decorator for models, see `invalidate_on`:
+
+        @caching.invalidates('books', 'book:{pk}')
+        class Book(models.Model):
+            ...
+    """
+    def decorator(model):
+        invalidate_on(model, *tags)
+        return model
+
+    return decorator
@@ -0,0 +1,73 @@
+"""
+Request coalescing (single-flight) for GET routes: concurrent identical requests wait for one computation
+and share its encoded response.
+"""
+
+import threading
+from django.http.response import HttpResponse
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
+
+def snapshot_response(response: HttpResponse) -> tuple:
+    return response.status_code, response.content, tuple(response.items())
+
+
+def response_from_snapshot(snapshot: tuple) -> HttpResponse:
+    status_code, content, headers = snapshot
+    response = HttpResponse(content, status=status_code)
+    for header, value in headers:
+        response[header] = value
+
+    return response
+
+
+class SingleFlight:
+    """
+    Runs only one computation per key at the same time.
+    Callers arriving while the computation for their key is in flight wait for it and receive a copy of its response;
+    if it raises, the exception is raised for all waiting callers too.
+    Only computations in concurrent threads are coalesced: django's ASGI handler runs synchronous views sequentially
+    in one thread, so they never overlap.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def do(self, key, compute: callable) -> HttpResponse:
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error:
+                raise flight.error
+
+            return response_from_snapshot(flight.response)
+
+        try:
+            response = compute()
+            flight.response = snapshot_response(response)
+            return response
+
+        except Exception as error:
+            flight.error = error
+            raise
+
+        finally:
+            with self._lock:
+                del self._flights[key]
+
+            flight.done.set()
+
+    def in_flight(self) -> int:
+        return len(self._flights)
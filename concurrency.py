@@ -0,0 +1,89 @@
+"""
+Per-route concurrency limits: excess requests are shed immediately (or after a short queueing time)
+instead of piling up and blocking all worker threads.
+"""
+
+import threading
+from . import exceptions, app_settings
+
+
+_limits = {}
+
+
+class ConcurrencyLimit:
+    """
+    Limits the number of requests handled at the same time within the current process.
+    Requests exceeding `max_in_flight` wait up to `queue_timeout` seconds for a free slot (not at all if not set),
+    afterwards they are rejected with a djsonrest.exceptions.ServiceUnavailableError.
+    """
+
+    def __init__(self, name: str, max_in_flight: int, queue_timeout: float = None, retry_after: int = None):
+        if max_in_flight < 1:
+            raise exceptions.InvalidRouteError("max_in_flight has to be at least 1 for %s" % name)
+
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after or app_settings.CONCURRENCY_RETRY_AFTER
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._condition = threading.Condition(threading.Lock())
+
+        _limits[name] = self
+
+    def _has_capacity(self):
+        return self.in_flight < self.max_in_flight
+
+    def acquire(self):
+        with self._condition:
+            if self.in_flight >= self.max_in_flight:
+                acquired = False
+                if self.queue_timeout:
+                    self.waiting += 1
+                    try:
+                        acquired = self._condition.wait_for(self._has_capacity, self.queue_timeout)
+                    finally:
+                        self.waiting -= 1
+
+                if not acquired:
+                    self.rejected += 1
+                    raise exceptions.ServiceUnavailableError(
+                        "Too many concurrent requests",
+                        code='overloaded',
+                        retry_after=self.retry_after,
+                    )
+
+            self.in_flight += 1
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def stats(self) -> dict:
+        return {
+            'max_in_flight': self.max_in_flight,
+            'in_flight': self.in_flight,
+            'waiting': self.waiting,
+            'rejected': self.rejected,
+        }
+
+    def __str__(self):
+        return f"ConcurrencyLimit({self.name}, {self.in_flight}/{self.max_in_flight})"
+
+    __repr__ = __str__
+
+
+def stats() -> dict:
+    """
+    Current in-flight, waiting and rejected request counts of all limited routes in this process
+    """
+    return {name: limit.stats() for name, limit in _limits.items()}
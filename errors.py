@@ -0,0 +1,50 @@
+"""
+Error handling helpers: memoized manageable error classes and pre-encoded error responses.
+"""
+
+import threading
+from django.http.response import HttpResponse
+from django.utils.translation import get_language
+from djutils.http import error_respond_json
+from . import exceptions
+
+
+PRERENDERED_MAX_SIZE = 512
+
+_manageable_error_classes = {}
+_prerendered = {}
+_prerendered_lock = threading.Lock()
+
+
+def manageable_error_class(error_class: type) -> type:
+    """
+    Returns a subclass of `error_class` and djutils' Error, so it can be handled like any djsonrest error.
+    The class is created once per `error_class`.
+    """
+    try:
+        return _manageable_error_classes[error_class]
+    except KeyError:
+        manageable_class = type(error_class.__name__, (exceptions.Error, error_class,), {})
+        return _manageable_error_classes.setdefault(error_class, manageable_class)
+
+
+def error_response(error: exceptions.Error, status_code: int) -> HttpResponse:
+    """
+    Like djutils.http.error_respond_json, but the encoded body is cached per error class, message, code, status
+    and language, so repeated errors are not serialized again.
+    """
+    key = (error.__class__, str(error.message), error.code, error.status_code, status_code, get_language())
+
+    try:
+        content, status = _prerendered[key]
+    except KeyError:
+        response = error_respond_json(error, status_code)
+        content, status = response.content, response.status_code
+
+        with _prerendered_lock:
+            if len(_prerendered) >= PRERENDERED_MAX_SIZE:
+                _prerendered.clear()
+
+            _prerendered[key] = (content, status)
+
+    return HttpResponse(content, status=status, content_type='application/json')
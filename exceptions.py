@@ -10,8 +10,11 @@ class DJsonRestError(Error):
     Base Error of djsonrest
     """
 
-    def __init__(self, message="", code=None, status_code=None, **kw):
+    retry_after = None
+
+    def __init__(self, message="", code=None, status_code=None, retry_after=None, **kw):
         super().__init__(message, code, status_code, **kw)
+        self.retry_after = retry_after or self.retry_after
 
 
 class AuthenticationError(DJsonRestError):
@@ -34,5 +37,29 @@ class RequestError(DJsonRestError):
     status_code = 400
 
 
+class ConflictError(DJsonRestError):
+    status_code = 409
+
+
+class PayloadTooLargeError(DJsonRestError):
+    status_code = 413
+
+
+class UnsupportedMediaTypeError(DJsonRestError):
+    status_code = 415
+
+
+class UnprocessableEntityError(DJsonRestError):
+    status_code = 422
+
+
+class TooManyRequestsError(DJsonRestError):
+    status_code = 429
+
+
+class ServiceUnavailableError(DJsonRestError):
+    status_code = 503
+
+
 class InvalidRouteError(Exception):
     pass
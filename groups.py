@@ -0,0 +1,147 @@
+"""
+Lifecycle of route groups and their shared resources.
+
+A route group (a subclass of rest.RESTRouteGroup) is instantiated for every call of one of its route functions
+or handlers by default (`lifecycle = 'request'`). With `lifecycle = 'singleton'` one instance per process is created
+on first use and shared by all threads, so it may hold expensive state.
+
+Expensive objects like http client pools or compiled templates can be declared as shared resources of a group;
+they are created lazily once per process and torn down by `shutdown()`, which runs on interpreter exit and can be
+called from the shutdown hooks of your server (e.g. gunicorn's worker_exit).
+"""
+
+import os
+import atexit
+import logging
+import threading
+
+
+_logger = logging.getLogger(__name__)
+
+REQUEST = 'request'
+SINGLETON = 'singleton'
+
+_lock = threading.RLock()
+_singletons = {}
+_created = []  # resources and singleton groups to tear down, in order of creation
+_missing = object()
+
+
+class resource:
+    """
+    Declares a shared resource of a route group. `factory` is called with the group class on first access,
+    the value is shared by all instances and threads of the process. `teardown` is called with the group class and
+    the value on shutdown.
+
+        class Weather(rest.RESTRouteGroup):
+            @groups.resource
+            def http(cls):
+                return requests.Session()
+
+            @http.teardown
+            def close_http(cls, session):
+                session.close()
+
+            @rest.get('/weather', version=1.0)
+            def weather_get(self, request):
+                return self.http.get(...).json()
+    """
+
+    def __init__(self, factory: callable, teardown: callable = None):
+        self.factory = factory
+        self.teardown_func = teardown
+        self.owner = None
+        self.name = getattr(factory, '__name__', None)
+        self.value = _missing
+
+    def __set_name__(self, owner, name):
+        if self.owner is None:
+            self.owner = owner
+            self.name = name
+
+    def __get__(self, instance, owner):
+        value = self.value
+        if value is _missing:
+            with _lock:
+                if self.value is _missing:
+                    self.value = self.factory(self.owner or owner)
+                    _created.append(self)
+                    _logger.debug("Created resource %r", self)
+
+                value = self.value
+
+        return value
+
+    def teardown(self, func: callable) -> 'resource':
+        """ Decorator declaring the teardown function of the resource """
+        self.teardown_func = func
+        return self
+
+    def close(self):
+        value, self.value = self.value, _missing
+        if value is not _missing and self.teardown_func:
+            self.teardown_func(self.owner, value)
+
+    def __str__(self):
+        return f"resource({getattr(self.owner, '__name__', None)}.{self.name})"
+
+    __repr__ = __str__
+
+
+def instance(group):
+    """
+    Returns the instance of the route group `group` to call a route function or handler with,
+    according to its lifecycle
+    """
+    if getattr(group, 'lifecycle', REQUEST) != SINGLETON:
+        return group()
+
+    try:
+        return _singletons[group]
+    except KeyError:
+        pass
+
+    with _lock:
+        if group not in _singletons:
+            _singletons[group] = group()
+            _created.append(_singletons[group])
+
+        return _singletons[group]
+
+
+def shutdown():
+    """
+    Tear down all created resources and singleton route groups (calling their `shutdown()` method), newest first
+    """
+    with _lock:
+        created = _created[:]
+        _created.clear()
+        _singletons.clear()
+
+    for obj in reversed(created):
+        try:
+            if isinstance(obj, resource):
+                obj.close()
+            elif hasattr(obj, 'shutdown'):
+                obj.shutdown()
+
+        except Exception: # pylint: disable=broad-except
+            _logger.exception("Tearing down %r failed", obj)
+
+
+def _after_fork():
+    # resources and singletons of the parent process (e.g. sockets of http pools) are not shared with forked workers
+    global _lock # pylint: disable=global-statement
+
+    _lock = threading.RLock()
+    for obj in _created:
+        if isinstance(obj, resource):
+            obj.value = _missing
+
+    _created.clear()
+    _singletons.clear()
+
+
+atexit.register(shutdown)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
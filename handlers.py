@@ -0,0 +1,161 @@
+"""
+Lean WSGI and ASGI entry points for rest routes.
+
+Requests below settings.REST_APPLICATION_PREFIX are resolved directly into the rest routes and only pass the
+middleware listed in settings.REST_APPLICATION_MIDDLEWARE; all other requests are handled by the django application.
+
+    # wsgi.py
+    from djsonrest.handlers import get_wsgi_application
+    application = get_wsgi_application()
+"""
+
+import logging
+import django
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.exception import convert_exception_to_response
+from django.core.handlers.wsgi import WSGIHandler
+from django.urls import path as url_path
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
+from . import app_settings, rest
+
+
+_logger = logging.getLogger(__name__)
+
+
+class RESTURLConf:
+    """
+    An URLconf containing only the rest routes, mounted at `prefix`
+    """
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix.strip('/')
+
+    @cached_property
+    def urlpatterns(self):
+        return [url_path(self.prefix + '/' if self.prefix else '', rest.routes.urls)]
+
+    def __str__(self):
+        return f"RESTURLConf(/{self.prefix})"
+
+    __repr__ = __str__
+
+
+class RESTHandlerMixin:
+    """
+    Loads the middleware of settings.REST_APPLICATION_MIDDLEWARE instead of settings.MIDDLEWARE
+    and resolves the requests using the `RESTURLConf`.
+    """
+
+    middleware = app_settings.APPLICATION_MIDDLEWARE
+    urlconf = RESTURLConf(app_settings.APPLICATION_PREFIX)
+
+    def load_middleware(self, is_async=False):
+        # django.core.handlers.base.BaseHandler.load_middleware, iterating self.middleware instead of settings.MIDDLEWARE
+        self._view_middleware = []
+        self._template_response_middleware = []
+        self._exception_middleware = []
+
+        handler = convert_exception_to_response(self._get_response_async if is_async else self._get_response)
+        handler_is_async = is_async
+        for middleware_path in reversed(self.middleware):
+            middleware = import_string(middleware_path)
+            middleware_can_sync = getattr(middleware, 'sync_capable', True)
+            middleware_can_async = getattr(middleware, 'async_capable', False)
+            if not middleware_can_sync and not middleware_can_async:
+                raise RuntimeError("Middleware %s must have at least one of sync_capable/async_capable set to True." % middleware_path)
+
+            if not handler_is_async and middleware_can_sync:
+                middleware_is_async = False
+            else:
+                middleware_is_async = middleware_can_async
+
+            try:
+                adapted_handler = self.adapt_method_mode(
+                    middleware_is_async, handler, handler_is_async,
+                    debug=settings.DEBUG, name='middleware %s' % middleware_path,
+                )
+                mw_instance = middleware(adapted_handler)
+            except MiddlewareNotUsed as error:
+                if settings.DEBUG:
+                    _logger.debug("MiddlewareNotUsed(%r): %s", middleware_path, error)
+                continue
+
+            handler = adapted_handler
+            if mw_instance is None:
+                raise ImproperlyConfigured("Middleware factory %s returned None." % middleware_path)
+
+            if hasattr(mw_instance, 'process_view'):
+                self._view_middleware.insert(0, self.adapt_method_mode(is_async, mw_instance.process_view))
+            if hasattr(mw_instance, 'process_template_response'):
+                self._template_response_middleware.append(self.adapt_method_mode(is_async, mw_instance.process_template_response))
+            if hasattr(mw_instance, 'process_exception'):
+                # the exception handling stack is always synchronous
+                self._exception_middleware.append(self.adapt_method_mode(False, mw_instance.process_exception))
+
+            handler = convert_exception_to_response(mw_instance)
+            handler_is_async = middleware_is_async
+
+        # assigned last, django uses it as flag for the initialization being complete
+        self._middleware_chain = self.adapt_method_mode(is_async, handler, handler_is_async)
+
+    def get_response(self, request):
+        request.urlconf = self.urlconf
+        return super().get_response(request)
+
+    async def get_response_async(self, request):
+        request.urlconf = self.urlconf
+        return await super().get_response_async(request)
+
+
+class RESTWSGIHandler(RESTHandlerMixin, WSGIHandler):
+    pass
+
+
+class RESTASGIHandler(RESTHandlerMixin, ASGIHandler):
+    pass
+
+
+def _path_prefix() -> str:
+    prefix = RESTHandlerMixin.urlconf.prefix
+    return '/%s/' % prefix if prefix else '/'
+
+
+def get_wsgi_application(application=None):
+    """
+    Returns a WSGI application passing requests below settings.REST_APPLICATION_PREFIX to a `RESTWSGIHandler`
+    and all other requests to `application` (by default the django WSGI application)
+    """
+    django.setup(set_prefix=False)
+    rest_application = RESTWSGIHandler()
+    application = application or WSGIHandler()
+    prefix = _path_prefix()
+
+    def dispatch(environ, start_response):
+        if environ.get('PATH_INFO', '').startswith(prefix):
+            return rest_application(environ, start_response)
+
+        return application(environ, start_response)
+
+    return dispatch
+
+
+def get_asgi_application(application=None):
+    """
+    Returns an ASGI application passing http requests below settings.REST_APPLICATION_PREFIX to a `RESTASGIHandler`
+    and all other requests to `application` (by default the django ASGI application)
+    """
+    django.setup(set_prefix=False)
+    rest_application = RESTASGIHandler()
+    application = application or ASGIHandler()
+    prefix = _path_prefix()
+
+    async def dispatch(scope, receive, send):
+        if scope['type'] == 'http' and scope['path'].startswith(prefix):
+            return await rest_application(scope, receive, send)
+
+        return await application(scope, receive, send)
+
+    return dispatch
@@ -0,0 +1,101 @@
+"""
+Idempotency keys for routes with `idempotent=True`.
+
+A client retrying a request sends the same `Idempotency-Key` header. The first response to a key is stored per client
+(consumer or user), route and key in the django cache settings.REST_IDEMPOTENCY_CACHE for
+settings.REST_IDEMPOTENCY_TIMEOUT seconds, unless it is a server error or larger than
+settings.REST_IDEMPOTENCY_MAX_SIZE. Later requests with the key replay it without calling the route function;
+requests arriving while the first one is in flight wait for its response (in other processes up to
+settings.REST_IDEMPOTENCY_WAIT seconds, then they are answered with 409 Conflict). All responses but the first one
+carry the `Idempotent-Replayed: true` header.
+Reusing a key for a request with another body is answered with 422.
+"""
+
+import time
+import hashlib
+from django.core.cache import caches
+from django.http.response import HttpResponse
+from . import app_settings, auth, exceptions
+from .coalescing import SingleFlight, snapshot_response, response_from_snapshot
+
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+_flights = SingleFlight()
+
+
+def fingerprint(request) -> str:
+    """ Requests using the same key have to be identical in method, url and body """
+    request_hash = hashlib.sha256(("%s %s\n" % (request.method, request.get_full_path())).encode())
+    request_hash.update(request.body)
+    return request_hash.hexdigest()
+
+
+def _replay(stored: tuple, request_fingerprint: str) -> HttpResponse:
+    stored_fingerprint, snapshot = stored
+    if stored_fingerprint != request_fingerprint:
+        raise exceptions.UnprocessableEntityError("The idempotency key was used for another request", code='idempotency_key_reused')
+
+    response = response_from_snapshot(snapshot)
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def _respond_once(cache_key: str, request_fingerprint: str, request, call_next: callable, args: tuple, kwargs: dict) -> HttpResponse:
+    cache = caches[app_settings.IDEMPOTENCY_CACHE]
+    lock_key = cache_key + ':lock'
+    deadline = time.monotonic() + app_settings.IDEMPOTENCY_WAIT
+
+    # another process may be handling a request with the same key
+    while True:
+        stored = cache.get(cache_key)
+        if stored is not None:
+            return _replay(stored, request_fingerprint)
+
+        if cache.add(lock_key, request_fingerprint, app_settings.IDEMPOTENCY_LOCK_TIMEOUT):
+            break
+
+        if time.monotonic() >= deadline:
+            raise exceptions.ConflictError("A request with this idempotency key is in progress", code='idempotency_key_in_use', retry_after=1)
+
+        time.sleep(0.05)
+
+    try:
+        response = call_next(request, *args, **kwargs)
+
+        if response.status_code < 500 and not response.streaming and len(response.content) <= app_settings.IDEMPOTENCY_MAX_SIZE:
+            cache.set(cache_key, (request_fingerprint, snapshot_response(response)), app_settings.IDEMPOTENCY_TIMEOUT)
+
+        return response
+
+    finally:
+        cache.delete(lock_key)
+
+
+def respond(route, request, call_next: callable, *args, **kwargs) -> HttpResponse:
+    """
+    Returns the stored response for the idempotency key of the request or calls `call_next` once for it
+    """
+    key = request.headers.get(HEADER)
+    if key is None:
+        return call_next(request, *args, **kwargs)
+
+    if not key or len(key) > 255:
+        raise exceptions.RequestError("Invalid idempotency key", code='idempotency_key_invalid')
+
+    cache_key = 'djsonrest:idempotency:%s' % hashlib.sha256(("%s\n%s\n%s" % (auth.identity(request), route, key)).encode()).hexdigest()
+    request_fingerprint = fingerprint(request)
+
+    led = []
+
+    def lead():
+        led.append(True)
+        return _respond_once(cache_key, request_fingerprint, request, call_next, args, kwargs)
+
+    response = _flights.do((cache_key, request_fingerprint), lead)
+    if not led:
+        # a copy of the response of the request in flight in this process
+        response[REPLAYED_HEADER] = 'true'
+
+    return response
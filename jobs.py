@@ -0,0 +1,244 @@
+"""
+Background jobs: routes with `background=True` are run in a thread pool after authentication and validation of the
+request; the client immediately receives `202 Accepted` with the id of the job and polls the job route
+(`<version>/jobs/<id>`) until it returns the response of the route. The job route is only registered once a route
+with `background=True` is declared.
+
+The state and the encoded response of a job are kept in the job store (settings.REST_JOB_STORE) for
+settings.REST_JOB_TIMEOUT seconds: `CacheJobStore` uses the django cache settings.REST_JOB_CACHE (use a shared
+backend like redis or the database cache if the job may be polled from another process), `LocalJobStore` keeps the
+jobs in the memory of the process.
+"""
+
+import re
+import time
+import secrets
+import logging
+import threading
+import contextvars
+from importlib import import_module
+from concurrent.futures import ThreadPoolExecutor
+from django.core.cache import caches
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import close_old_connections
+from django.http.response import JsonResponse
+from django.utils.module_loading import import_string
+from . import app_settings, exceptions, auth
+from .coalescing import snapshot_response, response_from_snapshot
+
+
+_logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+_executor = None
+_store = None
+_lock = threading.Lock()
+_queued = 0
+
+
+class JobDoesNotExist(ObjectDoesNotExist):
+    pass
+
+
+class JobStore:
+    """
+    Base of the job stores; a job is a dict containing its id, route, owner, status and the snapshot of its response
+    """
+
+    def save(self, job: dict):
+        raise NotImplementedError
+
+    def load(self, job_id: str) -> dict:
+        """ Returns the job or None if it does not exist (anymore) """
+        raise NotImplementedError
+
+
+class CacheJobStore(JobStore):
+    @property
+    def cache(self):
+        return caches[app_settings.JOB_CACHE]
+
+    def save(self, job: dict):
+        self.cache.set('djsonrest:job:%s' % job['id'], job, app_settings.JOB_TIMEOUT)
+
+    def load(self, job_id: str) -> dict:
+        return self.cache.get('djsonrest:job:%s' % job_id)
+
+
+class LocalJobStore(JobStore):
+    def __init__(self):
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def save(self, job: dict):
+        now = time.monotonic()
+        with self.lock:
+            self.jobs[job['id']] = (now + app_settings.JOB_TIMEOUT, dict(job))
+
+            for job_id, (expires, _job) in list(self.jobs.items()):
+                if expires > now:
+                    break  # in order of creation; jobs saved again only expire later
+
+                del self.jobs[job_id]
+
+    def load(self, job_id: str) -> dict:
+        try:
+            expires, job = self.jobs[job_id]
+        except KeyError:
+            return None
+
+        return dict(job) if expires > time.monotonic() else None
+
+
+def store() -> JobStore:
+    """ The job store of settings.REST_JOB_STORE, created on first use """
+    global _store # pylint: disable=global-statement
+
+    if _store is None:
+        with _lock:
+            if _store is None:
+                _store = import_string(app_settings.JOB_STORE)()
+
+    return _store
+
+
+def executor() -> ThreadPoolExecutor:
+    """ The thread pool running the jobs, created on first use """
+    global _executor # pylint: disable=global-statement
+
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=app_settings.JOB_WORKERS, thread_name_prefix='djsonrest-job')
+
+    return _executor
+
+
+def register_route():
+    """ Register the job route (djsonrest.rest_routes.jobs) """
+    import_module('djsonrest.rest_routes.jobs')
+
+
+def job_url(request, job_id: str) -> str:
+    """ The url of the job route, using the prefix and version of the url of the request """
+    version = re.search(r'/%s\d+\.\d{1,2}/' % re.escape(app_settings.VERSION_PREFIX), request.path)
+    return '%sjobs/%s' % (request.path[:version.end()], job_id)
+
+
+def accepted(request, job: dict) -> JsonResponse:
+    """ The 202 Accepted response pointing to the job route """
+    response = JsonResponse({'data': {'job': job['id'], 'status': job['status']}}, status=202)
+    response['Location'] = job_url(request, job['id'])
+    response['Retry-After'] = str(app_settings.JOB_POLL_INTERVAL)
+    return response
+
+
+def _run(job: dict, request, handle: callable, args: tuple, kwargs: dict):
+    global _queued # pylint: disable=global-statement
+
+    from .middleware import exception_response # pylint: disable=import-outside-toplevel
+
+    with _lock:
+        _queued -= 1
+
+    close_old_connections()
+    job['status'] = RUNNING
+    store().save(job)
+
+    try:
+        response = handle(request, *args, **kwargs)
+
+    except Exception as error: # pylint: disable=broad-except
+        response = exception_response(request, error)
+
+    finally:
+        close_old_connections()
+
+    job['status'] = DONE if response.status_code < 400 else FAILED
+    job['response'] = snapshot_response(response)
+    store().save(job)
+
+
+def submit(route, request, handle: callable, *args, **kwargs) -> JsonResponse:
+    """
+    Run `handle(request, *args, **kwargs)` as background job for the request to `route`
+    and return the 202 Accepted response
+    """
+    global _queued # pylint: disable=global-statement
+
+    with _lock:
+        if _queued >= app_settings.JOB_MAX_QUEUED:
+            raise exceptions.ServiceUnavailableError("Too many queued jobs", code='jobs_exhausted', retry_after=app_settings.JOB_POLL_INTERVAL)
+
+        _queued += 1
+
+    # the request body can not be read anymore once the response is returned
+    request.body # pylint: disable=pointless-statement
+
+    job = {
+        'id': secrets.token_urlsafe(24),
+        'route': (route.method, route.path, route.version.number),
+        'owner': auth.identity(request),
+        'status': PENDING,
+        'created': time.time(),
+        'response': None,
+    }
+    store().save(job)
+
+    try:
+        executor().submit(contextvars.copy_context().run, _run, dict(job), request, handle, args, kwargs)
+
+    except RuntimeError:
+        with _lock:
+            _queued -= 1
+
+        raise
+
+    return accepted(request, job)
+
+
+def _find_route(method: str, path: str, version: tuple):
+    from . import rest # pylint: disable=import-outside-toplevel
+
+    try:
+        version_routes = rest.rest_routes[path].version_routes.values()
+    except KeyError:
+        return None
+
+    for version_route in version_routes:
+        if version_route.version.number == version and method in version_route.method_routes:
+            method_route = version_route.method_routes[method]
+            if isinstance(method_route, rest.LazyRESTRouteVersionMethod):
+                method_route = method_route.load()
+
+            return method_route
+
+    return None
+
+
+def poll(request, job_id: str):
+    """
+    Returns the response of the job or, while it is running, the 202 Accepted response.
+    The request is authenticated using the authentication of the route of the job;
+    only the client which started the job may poll it.
+    """
+    job = store().load(job_id)
+    route = _find_route(*job['route']) if job else None
+    if route is None:
+        raise JobDoesNotExist("Job %s not found" % job_id)
+
+    route.auth.authenticate(request)
+    if auth.identity(request) != job['owner']:
+        raise JobDoesNotExist("Job %s not found" % job_id)
+
+    if job['response'] is None:
+        return accepted(request, job)
+
+    response = response_from_snapshot(job['response'])
+    # the error of a failed job is logged when it fails, not again on every poll
+    response._has_been_logged = job['status'] == FAILED # pylint: disable=protected-access
+    return response
@@ -0,0 +1,192 @@
+"""
+Non-blocking logging of rest requests.
+
+Log records are created on the request thread and put into a bounded queue; a background thread passes them
+to the handlers of their logger, so formatting (including tracebacks) and writing never stall a request.
+Identical errors are rate limited (settings.REST_ERROR_LOG_RATE), the number of suppressed records is added
+to the next logged one. If the queue is full, records are dropped and counted; the count is added to the next
+record put into the queue (also in its `rest_dropped` attribute).
+"""
+
+import os
+import sys
+import time
+import queue
+import atexit
+import logging
+import threading
+from . import app_settings, ratelimit
+
+
+access_logger = logging.getLogger('djsonrest.access')
+
+_lock = threading.Lock()
+_dropped_lock = threading.Lock()
+_queue = None
+_pid = None
+dropped = 0
+
+
+def _worker(records: queue.Queue):
+    while True:
+        record = records.get()
+        try:
+            if record is None:
+                return
+
+            logging.getLogger(record.name).handle(record)
+
+        finally:
+            records.task_done()
+
+
+def _records() -> queue.Queue:
+    """ The queue of the background thread of this process, started on first use (and again after a fork) """
+    global _queue, _pid # pylint: disable=global-statement
+
+    if _pid != os.getpid():
+        with _lock:
+            if _pid != os.getpid():
+                _queue = queue.Queue(maxsize=app_settings.LOG_QUEUE_SIZE)
+                threading.Thread(target=_worker, args=(_queue,), name='djsonrest-logging', daemon=True).start()
+                _pid = os.getpid()
+
+    return _queue
+
+
+def flush(timeout: float = None):
+    """ Wait until all queued records are written """
+    if _pid != os.getpid():
+        return
+
+    if timeout is None:
+        _queue.join()
+        return
+
+    deadline = time.monotonic() + timeout
+    while _queue.unfinished_tasks and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+atexit.register(flush, 5)
+
+
+def log(logger: logging.Logger, level: int, msg: str, *args, exc_info=None, extra: dict = None, stacklevel: int = 1):
+    """
+    Like logger.log(), but the record is handled by the background thread if settings.REST_LOG_ASYNC is enabled
+    """
+    global dropped # pylint: disable=global-statement
+
+    if not logger.isEnabledFor(level):
+        return
+
+    if exc_info is True:
+        exc_info = sys.exc_info()
+    elif isinstance(exc_info, BaseException):
+        exc_info = (exc_info.__class__, exc_info, exc_info.__traceback__)
+
+    with _dropped_lock:
+        dropped_before, dropped = (dropped, 0) if app_settings.LOG_ASYNC else (0, dropped)
+
+    if dropped_before:
+        msg = "%s - %%i records dropped before" % (msg if args else msg.replace('%', '%%'))
+        args += (dropped_before,)
+        extra = dict(extra or {}, rest_dropped=dropped_before)
+
+    try:
+        pathname, lineno, func, _stack_info = logger.findCaller(stacklevel=stacklevel + 1)
+    except ValueError:
+        pathname, lineno, func = "(unknown file)", 0, "(unknown function)"
+
+    record = logger.makeRecord(logger.name, level, pathname, lineno, msg, args, exc_info, func=func, extra=extra)
+
+    if not app_settings.LOG_ASYNC:
+        logger.handle(record)
+        return
+
+    try:
+        _records().put_nowait(record)
+    except queue.Full:
+        with _dropped_lock:
+            dropped += 1 + dropped_before
+
+
+class ErrorSampler:
+    """
+    Allows `count` records per `period` seconds for each key and counts the suppressed ones
+    """
+
+    MAX_KEYS = 1024
+
+    def __init__(self, rate: str):
+        self.count, self.period = ratelimit.parse_rate(rate)
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key) -> tuple:
+        """ Returns whether a record for `key` may be logged and the number of records suppressed before """
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.period:
+                if window is None and len(self._windows) >= self.MAX_KEYS:
+                    self._windows.clear()
+
+                suppressed = window[2] if window else 0
+                self._windows[key] = [now, 1, 0]
+                return True, suppressed
+
+            if window[1] < self.count:
+                window[1] += 1
+                return True, 0
+
+            window[2] += 1
+            return False, 0
+
+
+_sampler = ErrorSampler(app_settings.ERROR_LOG_RATE) if app_settings.ERROR_LOG_RATE else None
+
+
+def log_error(logger: logging.Logger, level: int, error: Exception, request, traceback: bool = True):
+    """
+    Log an exception raised by a rest route, rate limited per exception class, route and level
+    """
+    route = getattr(request, 'rest_request', None)
+    suppressed = 0
+
+    if _sampler:
+        allowed, suppressed = _sampler.allow((error.__class__, str(route), level))
+        if not allowed:
+            return
+
+    msg = "%s: %s (%s %s)"
+    args = [error.__class__.__name__, str(error), request.method, request.path]
+    if suppressed:
+        msg += " - %i similar records suppressed"
+        args.append(suppressed)
+
+    log(logger, level, msg, *args, exc_info=error if traceback else None, stacklevel=2)
+
+
+def access(request, response, duration: float):
+    """
+    Log a structured record of a rest request; the fields are available in the `rest` attribute of the record
+    """
+    route = request.rest_request
+    queries = getattr(request, 'rest_queries', None)
+    fields = {
+        'method': request.method,
+        'path': request.path,
+        'route': route.path,
+        'version': route.version.number,
+        'requested_version': getattr(request, 'rest_version_requested', None),
+        'auth': str(route.auth),
+        'status': response.status_code,
+        'duration_ms': duration * 1000,
+        'queries': queries.count if queries else None,
+        'query_duration_ms': queries.duration * 1000 if queries else None,
+    }
+    log(
+        access_logger, logging.INFO, "%s %s %i %.1fms", fields['method'], fields['path'], fields['status'], fields['duration_ms'],
+        extra={'rest': fields}, stacklevel=2,
+    )
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from djsonrest import autodiscover, manifest, rest, app_settings
+
+
+class Command(BaseCommand):
+    help = "Write the route manifest used to load rest route modules lazily, or check if it is up to date"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default=app_settings.ROUTE_MANIFEST, help="Manifest file, defaults to settings.REST_ROUTE_MANIFEST")
+        parser.add_argument('--check', action='store_true', help="Only check if the manifest is up to date; exits with an error if it is stale")
+
+    def handle(self, *args, path=None, check=False, **options):
+        if not path:
+            raise CommandError("Specify the manifest file or set REST_ROUTE_MANIFEST in your settings")
+
+        if check:
+            try:
+                problems = manifest.check_manifest(manifest.read_manifest(path))
+            except FileNotFoundError as error:
+                raise CommandError("Route manifest %s not found" % path) from error
+
+            if problems:
+                raise CommandError("Route manifest %s is stale: %s" % (path, ", ".join(problems)))
+
+            self.stdout.write(self.style.SUCCESS("Route manifest %s is up to date" % path))
+            return
+
+        # discover all routes like without a manifest, placeholders registered from an existing manifest
+        # are replaced by the discovered routes
+        for route in rest.rest_routes.values():
+            for route_version in route.version_routes.values():
+                route_version.manifest_modules = None
+
+        autodiscover()
+
+        route_manifest = manifest.build_manifest()
+        manifest.write_manifest(route_manifest, path)
+        self.stdout.write(self.style.SUCCESS("Wrote %i routes of %i modules to %s" % (
+            len(route_manifest['routes']), len(route_manifest['modules']), path,
+        )))
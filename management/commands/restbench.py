@@ -0,0 +1,75 @@
+import json
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, teardown_databases
+from djsonrest import bench, app_settings
+
+
+class Command(BaseCommand):
+    help = "Replay a traffic profile (JSONL) against the rest routes and report throughput, latencies and database queries"
+
+    def add_arguments(self, parser):
+        parser.add_argument('profile', help="JSONL file with one request per line (method, path, version, auth, body, query)")
+        parser.add_argument('-n', '--requests', type=int, default=None, help="Number of requests to send, cycling through the profile; defaults to the length of the profile")
+        parser.add_argument('-c', '--concurrency', type=int, default=1, help="Number of concurrent clients")
+        parser.add_argument('--warmup', type=int, default=0, help="Number of requests to send before measuring")
+        parser.add_argument('--url', default=None, help="Base url of a running server (e.g. http://127.0.0.1:8000); by default the WSGI application is run in-process")
+        parser.add_argument('--lean', action='store_true', help="Run the lean djsonrest.handlers WSGI application instead of the project's")
+        parser.add_argument('--prefix', default=app_settings.APPLICATION_PREFIX, help="Path the rest routes are mounted at, defaults to settings.REST_APPLICATION_PREFIX")
+        parser.add_argument('--test-database', action='store_true', help="Run against fresh test databases (in-memory for SQLite), like the test runner")
+        parser.add_argument('--fixture', action='append', default=[], help="Fixture to load into the test databases; can be given multiple times")
+        parser.add_argument('--json', action='store_true', dest='as_json', help="Write the report as json")
+
+    def handle(self, *args, profile=None, requests=None, concurrency=1, warmup=0, url=None, lean=False, prefix="", test_database=False, fixture=(), as_json=False, **options):
+        try:
+            entries = bench.read_profile(profile)
+        except FileNotFoundError as error:
+            raise CommandError("Traffic profile %s not found" % profile) from error
+
+        if not entries:
+            raise CommandError("Traffic profile %s is empty" % profile)
+
+        if url and (test_database or fixture):
+            raise CommandError("Test databases can only be used with the in-process application")
+
+        prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+        old_config = None
+        if test_database:
+            old_config = setup_databases(verbosity=0, interactive=False)
+            if fixture:
+                call_command('loaddata', *fixture, verbosity=0)
+
+        try:
+            if url:
+                target = bench.HTTPTarget(url, prefix)
+            elif lean:
+                from djsonrest.handlers import get_wsgi_application # pylint: disable=import-outside-toplevel
+                target = bench.WSGITarget(get_wsgi_application(), prefix)
+            else:
+                from django.core.wsgi import get_wsgi_application # pylint: disable=import-outside-toplevel
+                target = bench.WSGITarget(get_wsgi_application(), prefix)
+
+            report = bench.run(target, entries, requests=requests, concurrency=concurrency, warmup=warmup)
+
+        finally:
+            if old_config is not None:
+                teardown_databases(old_config, verbosity=0)
+
+        if as_json:
+            self.stdout.write(json.dumps(report, indent=1))
+            return
+
+        self.write_report(report)
+
+    def write_report(self, report: dict):
+        self.stdout.write("%i requests in %.2fs with %i clients: %.1f requests/s" % (
+            report['requests'], report['duration_s'], report['concurrency'], report['requests_per_s'],
+        ))
+        self.stdout.write("")
+        self.stdout.write("%-40s %8s %9s %9s %9s %9s  %s" % ("route", "requests", "p50 ms", "p95 ms", "p99 ms", "queries", "statuses"))
+        for name, summary in list(report['routes'].items()) + [("total", report)]:
+            self.stdout.write("%-40s %8i %9.2f %9.2f %9.2f %9s  %s" % (
+                name[:40], summary['requests'], summary['p50_ms'], summary['p95_ms'], summary['p99_ms'],
+                "-" if summary['queries_per_request'] is None else "%.1f" % summary['queries_per_request'],
+                " ".join("%s:%i" % item for item in summary['statuses'].items()),
+            ))
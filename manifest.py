@@ -0,0 +1,177 @@
+"""
+Route manifest: a generated file mapping path, version and method of all rest routes to the modules defining them.
+
+Using a manifest, the rest routes are registered on startup without importing the route modules;
+a module will be imported on the first request to one of its routes.
+"""
+
+import os
+import sys
+import json
+import hashlib
+import logging
+from importlib import import_module
+from django.apps import apps
+from django.utils.module_loading import module_has_submodule
+from . import rest
+
+
+_logger = logging.getLogger(__name__)
+
+MANIFEST_FORMAT = 1
+
+
+def _module_file(module_name: str, package: bool) -> str:
+    """ Path of the module source relative to its sys.path entry """
+    parts = module_name.split('.')
+    if package:
+        return os.path.join(*parts, '__init__.py')
+
+    return os.path.join(*parts[:-1], parts[-1] + '.py')
+
+
+def _find_file(relative_path: str) -> str:
+    for entry in sys.path:
+        candidate = os.path.join(entry or os.curdir, relative_path)
+        if os.path.isfile(candidate):
+            return candidate
+
+    return None
+
+
+def _file_hash(path: str) -> str:
+    with open(path, 'rb') as file:
+        return hashlib.sha1(file.read()).hexdigest()
+
+
+def _module_entry(module_name: str) -> dict:
+    module = sys.modules[module_name]
+    relative_path = _module_file(module_name, hasattr(module, '__path__'))
+    path = _find_file(relative_path)
+    return {
+        'file': relative_path,
+        'hash': _file_hash(path) if path else None,
+    }
+
+
+def _dotted_name(obj) -> str:
+    return "%s:%s" % (obj.__module__, obj.__qualname__)
+
+
+def _resolve_dotted_name(name: str):
+    module_name, qualname = name.split(':')
+    obj = import_module(module_name)
+    for attr in qualname.split('.'):
+        obj = getattr(obj, attr)
+
+    return obj
+
+
+def _discovered_modules() -> list:
+    """ The rest_routes modules of all installed apps, as found by djsonrest.autodiscover() """
+    return sorted(
+        '%s.rest_routes' % app_config.name
+        for app_config in apps.get_app_configs()
+        if module_has_submodule(app_config.module, 'rest_routes')
+    )
+
+
+def build_manifest() -> dict:
+    """
+    Build the manifest of the currently registered rest routes.
+    All route modules have to be imported already (djsonrest.autodiscover()).
+    Placeholders registered from a previous manifest, which have not been replaced by a discovered route, are skipped.
+    """
+    routes = []
+    modules = set(name for name in _discovered_modules() if name in sys.modules)
+
+    for route in rest.rest_routes.values():
+        for route_version in route.version_routes.values():
+            for method in rest.RESTRouteVersionMethod.HTTP_METHODS:
+                method_route = getattr(route_version, method.lower())
+                if not isinstance(method_route, rest.RESTRouteVersionMethod):
+                    continue
+
+                module = method_route.route_func.__module__
+                modules.add(module)
+                routes.append({
+                    'path': route_version.path,
+                    'version': list(route_version.version.number),
+                    'match': _dotted_name(route_version.version.match),
+                    'method': method,
+                    'name': route_version.name,
+                    'module': module,
+                })
+
+    return {
+        'format': MANIFEST_FORMAT,
+        'discovered': _discovered_modules(),
+        'modules': {name: _module_entry(name) for name in sorted(modules)},
+        'routes': routes,
+    }
+
+
+def write_manifest(manifest: dict, path: str):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+
+
+def read_manifest(path: str) -> dict:
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def check_manifest(manifest: dict) -> list:
+    """
+    Check the manifest against the current source files without importing any route module.
+    Returns a list of reasons why the manifest is stale; an empty list if it is up to date.
+    """
+    if manifest.get('format') != MANIFEST_FORMAT:
+        return ['unsupported manifest format']
+
+    problems = []
+    if manifest['discovered'] != _discovered_modules():
+        problems.append('the installed apps providing rest_routes changed')
+
+    for module_name, entry in manifest['modules'].items():
+        path = _find_file(entry['file'])
+        if not path:
+            problems.append('%s not found' % module_name)
+
+        elif entry['hash'] and _file_hash(path) != entry['hash']:
+            problems.append('%s changed' % module_name)
+
+    return problems
+
+
+def register_manifest(manifest: dict):
+    """
+    Register lazy placeholders for all routes of the manifest
+    """
+    for entry in manifest['routes']:
+        version = rest.RESTVersion(tuple(entry['version']), match=_resolve_dotted_name(entry['match']))
+        route_version = rest.RESTRoute.get_route(entry['path']).get_version_route(version, entry['name'])
+        route_version.register_lazy_method_route(entry['method'], entry['module'])
+
+    _logger.debug("Registered %i rest routes from the route manifest", len(manifest['routes']))
+
+
+def load(path: str, check: bool = True) -> bool:
+    """
+    Register the routes of the manifest at `path`.
+    Returns False if the manifest does not exist or is stale, so the routes have to be discovered instead.
+    """
+    try:
+        manifest = read_manifest(path)
+    except FileNotFoundError:
+        _logger.warning("Route manifest %s not found, discovering all rest routes", path)
+        return False
+
+    if check:
+        problems = check_manifest(manifest)
+        if problems:
+            _logger.warning("Route manifest %s is stale (%s), discovering all rest routes", path, ", ".join(problems))
+            return False
+
+    register_manifest(manifest)
+    return True
@@ -1,46 +1,91 @@
+import time
 import logging
 from django.core import exceptions as django_exceptions
 from djutils.http import error_respond_json
+from . import errors, exceptions, logs, app_settings, warmup
 
 
 _logger = logging.getLogger(__name__)
 
 
+def _retry_after(response, error):
+    retry_after = getattr(error, 'retry_after', None)
+    if retry_after:
+        response['Retry-After'] = str(int(retry_after))
+
+    return response
+
+
+def exception_response(request, error: Exception):
+    """
+    Log an exception raised while handling a request to a rest route and return its json error response
+    """
+    response = _exception_response(request, error)
+    # logged by logs.log_error (rate limited, non-blocking), django must not log the response again
+    response._has_been_logged = True # pylint: disable=protected-access
+    return response
+
+
+def _exception_response(request, error: Exception):
+    # expected client errors: no traceback is logged and the encoded response is reused
+    if isinstance(error, exceptions.AuthenticationError):
+        logs.log_error(_logger, logging.INFO, error, request, traceback=False)
+        return _retry_after(errors.error_response(error, status_code=400), error)
+
+    if isinstance(error, (django_exceptions.ObjectDoesNotExist, django_exceptions.FieldDoesNotExist)):
+        not_found = errors.manageable_error_class(error.__class__)(*error.args[:2], status_code=404)
+        logs.log_error(_logger, logging.INFO, not_found, request, traceback=False)
+        return errors.error_response(not_found, status_code=404)
+
+    try:
+        if isinstance(error, django_exceptions.ValidationError):
+            raise request.rest_request._exception_to_manageable_error(error)(
+                message=error.message,
+                code=error.code,
+                params=error.params,
+                status_code=400
+            ) from error
+
+        if isinstance(error, django_exceptions.SuspiciousOperation):
+            raise request.rest_request._exception_to_manageable_error(error)(*error.args[:2], status_code=403) from error
+
+        raise error
+
+    except request.rest_request.handled_exceptions as handled_error:
+        # expected errors of the route, the traceback is of no interest
+        logs.log_error(_logger, logging.WARNING, handled_error, request, traceback=False)
+        return _retry_after(error_respond_json(handled_error, status_code=400), handled_error)
+
+    except Exception as handled_error: # pylint: disable=broad-except  # catch any other exception to return a nice json error message
+        logs.log_error(_logger, logging.ERROR, handled_error, request)
+        return _retry_after(error_respond_json(handled_error, status_code=500), handled_error)
+
+
 class RESTRoutesMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
+        self.access_log = app_settings.ACCESS_LOG
+
+        # the middleware is loaded by the WSGI/ASGI application of the serving process, not by management commands
+        if app_settings.WARMUP:
+            warmup.run()
 
     def __call__(self, request):
-        return self.get_response(request)
+        if not self.access_log:
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        response = self.get_response(request)
+        if hasattr(request, "rest_request"):
+            logs.access(request, response, time.perf_counter() - start)
+
+        return response
 
     def process_exception(self, request, error):
         if not hasattr(request, "rest_request"):
             return
 
-        try:
-            if isinstance(error, (django_exceptions.ObjectDoesNotExist, django_exceptions.FieldDoesNotExist)):
-                raise request.rest_request._exception_to_manageable_error(error)(*error.args[:2], status_code=404) from error
-
-            if isinstance(error, django_exceptions.ValidationError):
-                raise request.rest_request._exception_to_manageable_error(error)(
-                    message=error.message,
-                    code=error.code,
-                    params=error.params,
-                    status_code=400
-                ) from error
-
-            if isinstance(error, django_exceptions.SuspiciousOperation):
-                raise request.rest_request._exception_to_manageable_error(error)(*error.args[:2], status_code=403) from error
-
-            raise error
-
-        except request.rest_request.handled_exceptions as handled_error:
-            _logger.exception(handled_error)
-            return error_respond_json(handled_error, status_code=400)
-
-        except Exception as handled_error: # pylint: disable=broad-except  # catch any other exception to return a nice json error message
-            _logger.exception(handled_error)
-            return error_respond_json(handled_error, status_code=500)
+        return exception_response(request, error)
 
 
 class RESTRoutesAccessControlMiddleware:
@@ -53,7 +98,8 @@ class RESTRoutesAccessControlMiddleware:
             return response
 
         response['Access-Control-Allow-Origin'] = response.get('Access-Control-Allow-Origin', '*')
-        response['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
-        response['Access-Control-Allow-Credentials'] = 'true'
-        response['Access-Control-Allow-Methods'] = ', '.join(request.rest_version.method_routes.keys())
+        if hasattr(request.rest_version, 'cors_headers'):
+            for header, value in request.rest_version.cors_headers().items():
+                response[header] = value
+
         return response
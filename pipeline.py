@@ -0,0 +1,101 @@
+"""
+The request pipeline of rest routes.
+
+The pipeline of a route is assembled once from the registered stages, outermost first. For each stage, its factory is
+called with the route (a rest.RESTRouteVersionMethod) and returns the stage callable, or None if the stage is not
+needed by the route (e.g. body parsing for GET routes), so a request only passes the stages its route uses.
+
+A stage is called as `stage(request, call_next, *args, **kwargs)` and returns a response, usually the one returned by
+`call_next(request, *args, **kwargs)`; it may also return a response without calling the next stage.
+The innermost call is the route function.
+
+    def timing(route):
+        def stage(request, call_next, *args, **kwargs):
+            start = time.perf_counter()
+            response = call_next(request, *args, **kwargs)
+            response['Server-Timing'] = 'app;dur=%.1f' % ((time.perf_counter() - start) * 1000)
+            return response
+
+        return stage
+
+    pipeline.register('timing', timing, before='authentication')
+
+The stages of djsonrest are (outermost first): concurrency, query_tracking, profiling, authentication,
+requested_profiling, database, idempotency, response_modifier, query, body, conditional, background, shared_response.
+Routes reassemble their pipeline when stages are registered or unregistered.
+"""
+
+from . import exceptions
+
+
+_stages = []  # (name, factory), outermost first
+generation = 0
+
+
+def _index(name: str) -> int:
+    for index, (stage_name, _factory) in enumerate(_stages):
+        if stage_name == name:
+            return index
+
+    raise exceptions.ConfigurationError("Unknown pipeline stage %r" % name)
+
+
+def register(name: str, factory: callable, before: str = None, after: str = None):
+    """
+    Register the stage `name`, created for each route by `factory(route)`.
+    The stage is placed before (outside of) or after (inside of) another stage, by default after all stages.
+    Registering an existing name replaces its factory.
+    """
+    global generation # pylint: disable=global-statement
+
+    if before and after:
+        raise exceptions.ConfigurationError("Specify either before or after for pipeline stage %r" % name)
+
+    if any(stage_name == name for stage_name, _factory in _stages):
+        unregister(name)
+
+    if before:
+        index = _index(before)
+    elif after:
+        index = _index(after) + 1
+    else:
+        index = len(_stages)
+
+    _stages.insert(index, (name, factory))
+    generation += 1
+
+
+def unregister(name: str):
+    global generation # pylint: disable=global-statement
+
+    del _stages[_index(name)]
+    generation += 1
+
+
+def stages() -> list:
+    """ Names of the registered stages, outermost first """
+    return [name for name, _factory in _stages]
+
+
+def _link(stage: callable, call_next: callable) -> callable:
+    def call(request, *args, **kwargs):
+        return stage(request, call_next, *args, **kwargs)
+
+    return call
+
+
+def build(route, handler: callable) -> tuple:
+    """
+    Returns the pipeline of `route` ending with `handler(request, *args, **kwargs)`
+    and the names of the stages it consists of
+    """
+    call = handler
+    names = []
+
+    for name, factory in reversed(_stages):
+        stage = factory(route)
+        if stage is not None:
+            call = _link(stage, call)
+            names.insert(0, name)
+
+    return call, names
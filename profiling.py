@@ -0,0 +1,122 @@
+"""
+Sampled profiling of single requests using cProfile.
+
+Profiling is only available if settings.REST_PROFILE_DIR is set; otherwise routes have no profiler at all.
+A request is profiled if it is sampled (the `profile_rate` of the route, its rate in settings.REST_PROFILE_ROUTES
+or settings.REST_PROFILE_SAMPLE_RATE) or if it sends the settings.REST_PROFILE_HEADER header and is privileged
+(see `is_privileged`). Sampled requests are profiled including their authentication; the permission of requests
+sending the header can only be checked after authentication, so their profile starts there and requests without
+permission are never profiled. The stats of a profiled request are written to settings.REST_PROFILE_DIR,
+keeping the newest settings.REST_PROFILE_MAX_FILES files.
+"""
+
+import os
+import re
+import time
+import random
+import cProfile
+import logging
+import threading
+from django.utils.module_loading import import_string
+from . import app_settings
+
+
+_logger = logging.getLogger(__name__)
+
+# why a request is profiled (request.rest_profile)
+SAMPLED = 'sampled'
+REQUESTED = 'requested'
+
+# only one request per process is profiled at the same time
+_profiling = threading.Lock()
+
+
+def is_privileged(request) -> bool:
+    """
+    Default check for requests asking to be profiled using the profile header:
+    the authenticated user (for consumers the user of the consumer) has to be a superuser
+    """
+    user = getattr(request, 'user', None)
+    return bool(user and user.is_superuser)
+
+
+def _cleanup(directory: str, max_files: int):
+    files = [entry for entry in os.scandir(directory) if entry.name.endswith('.prof')]
+    if len(files) <= max_files:
+        return
+
+    files.sort(key=lambda entry: entry.stat().st_mtime)
+    for entry in files[:len(files) - max_files]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+class RouteProfiler:
+    """
+    Decides whether a request to a route is profiled and writes the stats
+    """
+
+    def __init__(self, name: str, rate: float = None):
+        self.name = name
+        self.rate = rate if rate is not None else app_settings.PROFILE_SAMPLE_RATE
+        self.file_prefix = re.sub(r'[^A-Za-z0-9_.-]+', '_', name).strip('_')
+        self.header = app_settings.PROFILE_HEADER
+        self.permission = import_string(app_settings.PROFILE_PERMISSION)
+
+    def sample(self, request, handle: callable, *args, **kwargs):
+        """
+        Profile `handle(request, *args, **kwargs)` if the request is sampled; called before authentication
+        """
+        if not (self.rate and random.random() < self.rate):
+            return handle(request, *args, **kwargs)
+
+        return self.run(request, SAMPLED, handle, *args, **kwargs)
+
+    def requested(self, request, handle: callable, *args, **kwargs):
+        """
+        Profile `handle(request, *args, **kwargs)` if the request sends the profile header and is privileged;
+        called after authentication
+        """
+        if not (self.header and self.header in request.headers and self.permission(request)):
+            return handle(request, *args, **kwargs)
+
+        if getattr(request, 'rest_profile', None) == SAMPLED:
+            # already profiled since before authentication, `run` returns the file name
+            request.rest_profile = REQUESTED
+            return handle(request, *args, **kwargs)
+
+        return self.run(request, REQUESTED, handle, *args, **kwargs)
+
+    def run(self, request, reason: str, handle: callable, *args, **kwargs):
+        if not _profiling.acquire(blocking=False):
+            return handle(request, *args, **kwargs)
+
+        try:
+            request.rest_profile = reason
+            profiler = cProfile.Profile()
+            response = profiler.runcall(handle, request, *args, **kwargs)
+            path = self.write(profiler)
+            if request.rest_profile == REQUESTED:
+                response[self.header] = os.path.basename(path)
+
+            return response
+
+        finally:
+            _profiling.release()
+
+    def write(self, profiler: cProfile.Profile) -> str:
+        directory = app_settings.PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, "%s-%i-%i.prof" % (self.file_prefix, time.time_ns(), os.getpid()))
+        profiler.dump_stats(path)
+        _cleanup(directory, app_settings.PROFILE_MAX_FILES)
+
+        _logger.info("Wrote profile of %s to %s", self.name, path)
+        return path
+
+    def __str__(self):
+        return f"RouteProfiler({self.name}, rate={self.rate})"
+
+    __repr__ = __str__
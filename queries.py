@@ -0,0 +1,115 @@
+"""
+Database query budgets and N+1 detection for rest routes.
+
+If settings.REST_QUERY_TRACKING_RATE is set, this fraction of the requests to each route is tracked:
+the queries of all database connections are counted and timed using django's execute wrappers.
+Requests exceeding the query budget of their route (the `query_budget` of the route or settings.REST_QUERY_BUDGET)
+or repeating the same statement settings.REST_QUERY_REPEAT_THRESHOLD times (N+1) are reported
+to settings.REST_QUERY_REPORTER, which logs them by default.
+"""
+
+import re
+import time
+import random
+import logging
+import contextlib
+from django.db import connections
+from django.utils.module_loading import import_string
+from . import app_settings
+
+
+_logger = logging.getLogger(__name__)
+
+_placeholder_list = re.compile(r'%s(?:\s*,\s*%s)+')
+
+
+def normalize_sql(sql: str) -> str:
+    """ Statements differing only in the number of parameters of an IN clause are structurally identical """
+    return _placeholder_list.sub('%s, ...', sql)
+
+
+class RequestQueries:
+    """
+    Execute wrapper counting and timing the queries of a request
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.statements[sql] = self.statements.get(sql, 0) + 1
+
+    def repeated(self, threshold: int) -> list:
+        """ Returns (statement, count) of the statements executed at least `threshold` times, most repeated first """
+        counts = {}
+        for sql, count in self.statements.items():
+            sql = normalize_sql(sql)
+            counts[sql] = counts.get(sql, 0) + count
+
+        return sorted(((sql, count) for sql, count in counts.items() if count >= threshold), key=lambda item: -item[1])
+
+
+def log_report(route, request, queries: RequestQueries, budget: int, repeated: list):
+    """ Default reporter: logs a warning naming the route, the requested version and the offending statements """
+    message = "%s (requested version %s): %i queries in %.1fms" % (
+        route, getattr(request, 'rest_version_requested', None), queries.count, queries.duration * 1000,
+    )
+    if budget is not None and queries.count > budget:
+        message += ", exceeding the budget of %i queries" % budget
+
+    for sql, count in repeated:
+        message += "\n  %ix %s" % (count, sql)
+
+    _logger.warning(message)
+
+
+class QueryTracker:
+    """
+    Tracks the queries of sampled requests to a route and reports exceeded budgets and repeated statements
+    """
+
+    def __init__(self, route, budget: int = None):
+        self.route = route
+        self.budget = budget if budget is not None else app_settings.QUERY_BUDGET
+        self.rate = app_settings.QUERY_TRACKING_RATE
+        self.threshold = app_settings.QUERY_REPEAT_THRESHOLD
+        self.reporter = import_string(app_settings.QUERY_REPORTER)
+
+    def wrap(self, request, handle: callable) -> callable:
+        """
+        Returns `handle` wrapped in the query tracking if the request is sampled, otherwise `handle` itself
+        """
+        if random.random() >= self.rate:
+            return handle
+
+        def tracked_handle(request, *args, **kwargs):
+            queries = request.rest_queries = RequestQueries()
+            try:
+                with contextlib.ExitStack() as stack:
+                    for connection in connections.all():
+                        stack.enter_context(connection.execute_wrapper(queries))
+
+                    return handle(request, *args, **kwargs)
+
+            finally:
+                self.check(request, queries)
+
+        return tracked_handle
+
+    def check(self, request, queries: RequestQueries):
+        repeated = queries.repeated(self.threshold) if self.threshold and queries.count >= self.threshold else []
+        if repeated or (self.budget is not None and queries.count > self.budget):
+            self.reporter(self.route, request, queries, self.budget, repeated)
+
+    def __str__(self):
+        return f"QueryTracker({self.route}, budget={self.budget})"
+
+    __repr__ = __str__
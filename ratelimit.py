@@ -0,0 +1,142 @@
+"""
+Token bucket rate limiting with counters shared between all worker processes on a host.
+
+The buckets are stored in a memory mapped file, so the limits hold across prefork workers without a network service.
+"""
+
+import os
+import re
+import mmap
+import time
+import struct
+import hashlib
+import threading
+from functools import lru_cache
+from . import exceptions, app_settings
+
+try:
+    import fcntl
+except ImportError: # pragma: no cover
+    fcntl = None
+
+
+# key hash, tokens, timestamp of the last update
+_SLOT = struct.Struct('=Qdd')
+_PERIODS = {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400}
+_rate_format = re.compile(r'^\s*(\d+)\s*/\s*(\d*)\s*([smhd]?)\s*$')
+
+
+@lru_cache(maxsize=256)
+def parse_rate(value: str) -> tuple:
+    """
+    Parse a rate like `100/60` (100 requests per 60 seconds), `10/s`, `600/5m`, `1000/h` or `10000/d`.
+    Returns a tuple of the number of requests and the period in seconds.
+    """
+    match = _rate_format.match(value)
+    if not match or not int(match[1]):
+        raise ValueError("Invalid rate %r" % value)
+
+    period = int(match[2] or 1) * _PERIODS[match[3]]
+    if not period:
+        raise ValueError("Invalid rate %r" % value)
+
+    return int(match[1]), period
+
+
+class SharedTokenBuckets:
+    """
+    A fixed size table of token buckets in a memory mapped file.
+    Buckets are addressed by the hash of their key using linear probing; if all probed slots are in use,
+    the least recently updated bucket is replaced.
+    """
+
+    PROBES = 8
+
+    def __init__(self, path: str, slots: int = 65536):
+        self.path = path
+        self.slots = slots
+        self._lock = threading.Lock()
+        self._pid = None
+        self._file = None
+        self._map = None
+
+    def _open(self):
+        if self._pid == os.getpid():
+            return
+
+        size = self.slots * _SLOT.size
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(fd).st_size < size:
+            os.ftruncate(fd, size)
+
+        self._file = fd
+        self._map = mmap.mmap(fd, size)
+        self._pid = os.getpid()
+
+    def take(self, key: str, rate: float, capacity: float, cost: float = 1.0) -> float:
+        """
+        Take `cost` tokens from the bucket `key`, which is refilled with `rate` tokens per second up to `capacity`.
+        Returns 0 if the tokens were taken, otherwise the seconds until enough tokens are available.
+        """
+        key_hash = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little') or 1
+        start = key_hash % self.slots
+
+        with self._lock:
+            self._open()
+            if fcntl:
+                fcntl.lockf(self._file, fcntl.LOCK_EX)
+
+            try:
+                now = time.time()
+                slot = tokens = None
+                oldest = None
+
+                for probe in range(self.PROBES):
+                    index = (start + probe) % self.slots
+                    slot_hash, slot_tokens, slot_time = _SLOT.unpack_from(self._map, index * _SLOT.size)
+
+                    if slot_hash == key_hash:
+                        slot = index
+                        tokens = min(capacity, slot_tokens + (now - slot_time) * rate)
+                        break
+
+                    if not slot_hash:
+                        slot = index
+                        break
+
+                    if oldest is None or slot_time < oldest[1]:
+                        oldest = (index, slot_time)
+
+                if slot is None:
+                    slot = oldest[0]
+
+                if tokens is None:
+                    tokens = capacity
+
+                if tokens >= cost:
+                    tokens -= cost
+                    wait = 0.0
+                else:
+                    wait = (cost - tokens) / rate
+
+                _SLOT.pack_into(self._map, slot * _SLOT.size, key_hash, tokens, now)
+                return wait
+
+            finally:
+                if fcntl:
+                    fcntl.lockf(self._file, fcntl.LOCK_UN)
+
+
+buckets = SharedTokenBuckets(app_settings.RATE_LIMIT_FILE, app_settings.RATE_LIMIT_SLOTS)
+
+
+def check_rate(key: str, rate: str):
+    """
+    Count a request against the rate (see `parse_rate`) for `key`.
+    Raises a djsonrest.exceptions.TooManyRequestsError including the seconds to wait if the rate is exceeded.
+    """
+    count, period = parse_rate(rate)
+    wait = buckets.take("%s:%s" % (key, rate), count / period, count)
+
+    if wait:
+        raise exceptions.TooManyRequestsError("Rate limit exceeded", code='rate_limit_exceeded', retry_after=max(1, int(wait + 0.999)))
@@ -3,19 +3,21 @@ Base Module of djsonrest containing interfaces to create rest routes
 """
 
 import logging
-import json
 import enum
 import re
+from importlib import import_module
 
 from django.urls import path as url_path, re_path, register_converter
 from django.views.generic import View
 from django.http.response import HttpResponse, JsonResponse, HttpResponse, HttpResponseNotModified
 from django.utils.decorators import classonlymethod
+from django.db.models import QuerySet
 from djutils.http import respond_json
-from . import exceptions, auth as rest_auth, app_settings
+from . import exceptions, auth as rest_auth, app_settings, body as rest_body, validation, serializers, concurrency, coalescing, caching, errors, profiling, queries, groups, routers, pipeline, jobs, idempotency
 
 
 _logger = logging.getLogger(__name__)
+_default = object()  # body limits not given: use the settings; None disables the limit
 rest_routes = {}
 
 
@@ -108,6 +110,30 @@ class RESTVersion:
         return hash((self.number, self.match))
 
 
+class RawJSON:
+    """
+    Already encoded json data returned by a route function.
+    The data is spliced into the response envelope as it is, without decoding and encoding it again.
+    Set `envelope` to False if the data already contains the complete response including the envelope.
+    """
+
+    def __init__(self, data, envelope: bool = True):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+
+        self.data = data
+        self.envelope = envelope
+
+    def as_response(self, status: int = 200) -> HttpResponse:
+        content = b'{"data": ' + self.data + b'}' if self.envelope else self.data
+        return HttpResponse(content, content_type='application/json', status=status)
+
+    def __str__(self):
+        return f"RawJSON({len(self.data)} bytes)"
+
+    __repr__ = __str__
+
+
 class RESTRouteVersionMethod:
     HTTP_METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
     handled_exceptions = (exceptions.Error,)
@@ -115,7 +141,7 @@ class RESTRouteVersionMethod:
     @classmethod
     def _exception_to_manageable_error(cls, error):
         if not isinstance(error, exceptions.Error):
-            return type(error.__class__.__name__, (exceptions.Error, error.__class__,), {})
+            return errors.manageable_error_class(error.__class__)
 
         return error
 
@@ -131,6 +157,25 @@ class RESTRouteVersionMethod:
             name: str = None,
             handled_exceptions: tuple = (),
             response_modifier: callable = None,
+            max_body_size: int = _default,
+            max_body_depth: int = _default,
+            body_schema: dict = None,
+            query_schema: dict = None,
+            fields: list = None,
+            max_in_flight: int = None,
+            queue_timeout: float = None,
+            single_flight: bool = False,
+            vary_auth: bool = True,
+            cache_timeout: int = None,
+            stale_while_revalidate: int = None,
+            stale_if_error: int = None,
+            cache_tags=None,
+            profile_rate: float = None,
+            query_budget: int = None,
+            stream_body: bool = False,
+            read_replica: bool = True,
+            background: bool = False,
+            idempotent: bool = False,
         ):
         if not path and name != "default":
             raise exceptions.InvalidRouteError('Undefined path for %r' % route_func)
@@ -146,6 +191,27 @@ class RESTRouteVersionMethod:
         elif not isinstance(version, RESTVersion):
             raise exceptions.InvalidRouteError("Specify the version using RESTVersion() or a single float or int for %r" % route_func)
 
+        if body_schema and method == 'GET':
+            raise exceptions.InvalidRouteError("A GET route may not define a body schema for %r" % route_func)
+
+        if stream_body and method == 'GET':
+            raise exceptions.InvalidRouteError("A GET route may not stream the request body for %r" % route_func)
+
+        if single_flight and method != 'GET':
+            raise exceptions.InvalidRouteError("Only GET routes can be coalesced for %r" % route_func)
+
+        if idempotent and method == 'GET':
+            raise exceptions.InvalidRouteError("A GET route is idempotent by definition for %r" % route_func)
+
+        if idempotent and stream_body:
+            raise exceptions.InvalidRouteError("An idempotent route may not stream the request body for %r" % route_func)
+
+        if background and (stream_body or single_flight or cache_timeout):
+            raise exceptions.InvalidRouteError("A background route may not stream the request body or share its responses for %r" % route_func)
+
+        if (cache_timeout or cache_tags) and method != 'GET':
+            raise exceptions.InvalidRouteError("Only responses of GET routes can be cached for %r" % route_func)
+
         self.route_func = route_func
         self.path = path
         self.version = version
@@ -155,6 +221,25 @@ class RESTRouteVersionMethod:
         self.cache = cache
         self.name = name
         self.response_modifier = response_modifier
+        self.max_body_size = max_body_size if max_body_size is not _default else app_settings.MAX_BODY_SIZE
+        self.max_body_depth = max_body_depth if max_body_depth is not _default else app_settings.MAX_BODY_DEPTH
+        self.body_validator = validation.compile_schema(body_schema) if body_schema else None
+        self.stream_body = stream_body
+        self.background = background
+        self.idempotent = idempotent
+        self.query_validator = validation.compile_schema(query_schema, coerce=True) if query_schema else None
+        self.serializer = serializers.QuerySetSerializer(fields) if fields else None
+        self.concurrency_limit = None
+        self.profiler = None
+        self.query_tracker = None
+        self.single_flight = coalescing.SingleFlight() if single_flight else None
+        self.vary_auth = vary_auth
+        self.response_cache = None
+        self.cache_tags = caching.CacheTags(cache_tags) if cache_tags else None
+        self.read_replica = bool(read_replica and self.method == 'GET' and app_settings.DB_REPLICAS)
+        self.stages = []
+        self._pipeline = None
+        self._pipeline_generation = None
 
         if not handled_exceptions and self.auth.handled_exceptions:
             handled_exceptions = self.auth.handled_exceptions
@@ -164,13 +249,41 @@ class RESTRouteVersionMethod:
         self.route_version = RESTRoute.get_route(self.path).get_version_route(self.version, self.name)
         self.route_version.register_method_route(self)
 
+        if cache_timeout:
+            self.response_cache = caching.ResponseCache(
+                f"{self.method} {self.path} @ {self.version.number}",
+                cache_timeout,
+                stale_while_revalidate,
+                stale_if_error,
+                self.handled_exceptions,
+            )
+
+        if max_in_flight:
+            self.concurrency_limit = concurrency.ConcurrencyLimit(
+                f"{self.method} {self.path} @ {self.version.number}",
+                max_in_flight,
+                queue_timeout,
+            )
+
+        if app_settings.QUERY_TRACKING_RATE:
+            self.query_tracker = queries.QueryTracker(self, query_budget)
+
+        if app_settings.PROFILE_DIR:
+            if profile_rate is None:
+                profile_rate = app_settings.PROFILE_ROUTES.get(f"{self.method} {self.path}")
+
+            self.profiler = profiling.RouteProfiler(f"{self.method} {self.path} @ {self.version.number}", profile_rate)
+
+        if background:
+            jobs.register_route()
+
         _logger.debug("Registered new rest route %r", self)
 
     @respond_json
     def __call__(self, request, *args, **kwargs) -> HttpResponse:
         """
-        Wrapper around the actual request method.
-        Performs authentication and loads the request body as json into request.body (encoding is fixed to UTF-8).
+        Wrapper around the actual request method, passing the request through the stages of the pipeline of this route.
+        Performs authentication and provides the request body as lazily parsed json in request.JSON (encoding is fixed to UTF-8).
         Handles ocurring exceptions.
         Returns a dict with 'data' containing the returned data from the request method,
         if 'data' is not already present.
@@ -178,73 +291,212 @@ class RESTRouteVersionMethod:
         """
 
         request.rest_request = self
-        cache_response = route_result = response = None
 
+        if self._pipeline_generation != pipeline.generation:
+            self.build_pipeline()
+
+        return self._pipeline(request, *args, **kwargs)
+
+    def build_pipeline(self):
+        """
+        Assemble the request pipeline of this route from the stages it needs (see djsonrest.pipeline)
+        """
+        self._pipeline_generation = pipeline.generation
+        self._pipeline, self.stages = pipeline.build(self, self.respond)
+
+    def limit_concurrency(self, request, call_next, *args, **kwargs) -> HttpResponse:
+        with self.concurrency_limit:
+            return call_next(request, *args, **kwargs)
+
+    def track_queries(self, request, call_next, *args, **kwargs) -> HttpResponse:
+        return self.query_tracker.wrap(request, call_next)(request, *args, **kwargs)
+
+    def profile_sampled(self, request, call_next, *args, **kwargs) -> HttpResponse:
+        return self.profiler.sample(request, call_next, *args, **kwargs)
+
+    def profile_requested(self, request, call_next, *args, **kwargs) -> HttpResponse:
+        return self.profiler.requested(request, call_next, *args, **kwargs)
+
+    def authenticate(self, request, call_next, *args, **kwargs) -> HttpResponse:
+        rest_body.check_content_length(request, self.max_body_size)
         self.auth.authenticate(request)
+        return call_next(request, *args, **kwargs)
 
-        if request.method != 'GET':
-            try:
-                request.JSON = json.loads(request.body, encoding='utf-8') if request.body else {}
+    def authenticate_response(self, request, call_next, *args, **kwargs) -> HttpResponse:
+        """ Authentication for auth classes modifying the response """
+        rest_body.check_content_length(request, self.max_body_size)
+        self.auth.authenticate(request)
+        return self.auth.response(request, call_next(request, *args, **kwargs))
+
+    def use_read_replica(self, request, call_next, *args, **kwargs) -> HttpResponse:
+        with routers.replica(request):
+            return call_next(request, *args, **kwargs)
+
+    def stick_to_primary(self, request, call_next, *args, **kwargs) -> HttpResponse:
+        response = call_next(request, *args, **kwargs)
+
+        if response.status_code < 400:
+            routers.mark_written(request, response)
+
+        return response
 
-            except json.JSONDecodeError as error:
-                raise exceptions.EncodingError(error.args[0]) from error
+    def idempotent_response(self, request, call_next, *args, **kwargs) -> HttpResponse:
+        return idempotency.respond(self, request, call_next, *args, **kwargs)
 
-        elif request.body:
-            # GET Request with a request body
+    def modify_response(self, request, call_next, *args, **kwargs) -> HttpResponse:
+        return self.response_modifier(request, call_next(request, *args, **kwargs))
+
+    def validate_query(self, request, call_next, *args, **kwargs) -> HttpResponse:
+        request.QUERY = self.query_validator(request.GET)
+        return call_next(request, *args, **kwargs)
+
+    def reject_body(self, request, call_next, *args, **kwargs) -> HttpResponse:
+        if request.body:
             raise exceptions.RequestError("A GET request may not have a request body")
 
-        elif self.cache:
-            # GET Request and cache function available
-            cache_response = self.cache(request, *args, **kwargs)
+        return call_next(request, *args, **kwargs)
+
+    def lazy_body(self, request, call_next, *args, **kwargs) -> HttpResponse:
+        rest_body.lazy_body(request, self.max_body_size, self.max_body_depth)
+        return call_next(request, *args, **kwargs)
+
+    def validate_body(self, request, call_next, *args, **kwargs) -> HttpResponse:
+        data = rest_body.parse_body(request, self.max_body_size, self.max_body_depth)
+        request.JSON = self.body_validator(data) if self.body_validator else data
+        return call_next(request, *args, **kwargs)
+
+    def stream_items(self, request, call_next, *args, **kwargs) -> HttpResponse:
+        items = rest_body.stream_body(request, self.max_body_size, self.max_body_depth)
+        request.JSON = map(self.body_validator, items) if self.body_validator else items
+        return call_next(request, *args, **kwargs)
+
+    def conditional_response(self, request, call_next, *args, **kwargs) -> HttpResponse:
+        """
+        Answer conditional requests with 304 Not Modified using the cache function and/or cache tags
+        """
+        cache_response = request.rest_cache_response = self.cache_validators(request, *args, **kwargs)
+
+        if cache_response:
+            try:
+                if cache_response['ETag'] == request.headers['If-None-Match']:
+                    return HttpResponseNotModified()
+
+            except KeyError:
+                pass
+
+            try:
+                if cache_response['Last-Modified'] == request.headers['If-Modified-Since']:
+                    return HttpResponseNotModified()
 
-            if cache_response:
-                try:
-                    if cache_response['ETag'] == request.headers['If-None-Match']:
-                        response = HttpResponseNotModified()
+            except KeyError:
+                pass
 
-                except KeyError:
-                    pass
+        return call_next(request, *args, **kwargs)
 
-                try:
-                    if cache_response['Last-Modified'] == request.headers['If-Modified-Since']:
-                        response = HttpResponseNotModified()
+    def run_in_background(self, request, call_next, *args, **kwargs) -> HttpResponse:
+        def handle(request, *args, **kwargs):
+            # the earlier stages only wrap the 202 Accepted response, the job response is modified the same way
+            response = call_next(request, *args, **kwargs)
+            if self.response_modifier:
+                response = self.response_modifier(request, response)
 
-                except KeyError:
-                    pass
+            return self.auth.response(request, response)
 
-        if not response:
-            if self.route_func.rest_dec.func_owner:
-                route_result = self.route_func(self.route_func.rest_dec.func_owner(), request, *args, **kwargs)
+        return jobs.submit(self, request, handle, *args, **kwargs)
 
-            else:
-                route_result = self.route_func(request, *args, **kwargs)
+    def respond(self, request, *args, **kwargs) -> HttpResponse:
+        return self.route_response(request, getattr(request, 'rest_cache_response', None), *args, **kwargs)
 
+    def route_response(self, request, cache_response, *args, **kwargs) -> HttpResponse:
+        """
+        Call the route function and encode its result into a response
+        """
+        if self.route_func.rest_dec.func_owner:
+            route_result = self.route_func(groups.instance(self.route_func.rest_dec.func_owner), request, *args, **kwargs)
+
+        else:
+            route_result = self.route_func(request, *args, **kwargs)
+
+        if self.serializer and isinstance(route_result, QuerySet):
+            route_result = self.serializer(route_result)
+
+        if isinstance(route_result, HttpResponse):
+            response = route_result
+
+        elif self.response_status == 204:
+            response = HttpResponse(status=self.response_status)
+
+        elif isinstance(route_result, RawJSON):
+            response = route_result.as_response(status=self.response_status)
+
+        else:
             if not (isinstance(route_result, dict) and 'data' in route_result):
                 route_result = {'data': route_result}
 
-            if self.response_status == 204:
-                response = HttpResponse(status=self.response_status)
+            response = JsonResponse(route_result, safe=False, status=self.response_status)
+
+        if cache_response:
+            try:
+                response['ETag'] = cache_response['ETag']
+
+            except KeyError:
+                pass
+
+            try:
+                response['Last-Modified'] = cache_response['Last-Modified']
+
+            except KeyError:
+                pass
+
+        return response
 
-            else:
-                response = JsonResponse(route_result, safe=False, status=self.response_status)
+    def cache_validators(self, request, *args, **kwargs) -> HttpResponse:
+        """
+        Returns a response containing the ETag and/or Last-Modified header of the requested ressource.
+        Uses the cache function of the route; with cache tags, an ETag is derived from the tag generations if the cache
+        function does not provide one.
+        """
+        cache_response = self.cache(request, *args, **kwargs) if self.cache else None
+
+        if self.cache_tags:
+            request.rest_cache_generations = self.cache_tags.generations(request, *args, **kwargs)
 
-            if cache_response:
-                try:
-                    response['ETag'] = cache_response['ETag']
+            if cache_response is None or not cache_response.has_header('ETag'):
+                cache_response = cache_response or HttpResponse()
+                cache_response['ETag'] = caching.etag(str(self), self.request_key(request, *args, **kwargs), request.rest_cache_generations)
 
-                except KeyError:
-                    pass
+        return cache_response
 
-                try:
-                    response['Last-Modified'] = cache_response['Last-Modified']
+    def shared_route_response(self, request, call_next, *args, **kwargs) -> HttpResponse:
+        """
+        Get the response from the response cache and/or from a coalesced call of the route function
+        """
+        request_key = self.request_key(request, *args, **kwargs)
 
-                except KeyError:
-                    pass
+        def compute(request):
+            if self.single_flight:
+                return self.single_flight.do(request_key, lambda: call_next(request, *args, **kwargs))
 
-        if self.response_modifier:
-            response = self.response_modifier(request, response)
+            return call_next(request, *args, **kwargs)
 
-        return self.auth.response(request, response)
+        if self.response_cache:
+            return self.response_cache.get(request, request_key, compute)
+
+        return compute(request)
+
+    def request_key(self, request, *args, **kwargs) -> tuple:
+        """
+        Requests with the same key share their response (coalesced or cached):
+        requested version, arguments, query, (optionally) the authenticated client and the cache tag generations
+        """
+        return (
+            getattr(request, 'rest_version_requested', None),
+            args,
+            tuple(sorted(kwargs.items())),
+            tuple(sorted((key, tuple(values)) for key, values in request.GET.lists())),
+            rest_auth.identity(request) if self.vary_auth else None,
+            getattr(request, 'rest_cache_generations', None),
+        )
 
     def __str__(self):
         return f"RESTRouteVersionMethod({self.method} {self.path} @ {self.version}, auth={self.auth})"
@@ -252,8 +504,42 @@ class RESTRouteVersionMethod:
     __repr__ = __str__
 
 
+class LazyRESTRouteVersionMethod:
+    """
+    Placeholder for a method route loaded from a route manifest.
+    The module defining the route is imported on the first request, which replaces the placeholder with the actual route.
+    """
+
+    def __init__(self, route_version, method: str, module: str):
+        self.route_version = route_version
+        self.method = method
+        self.module = module
+        self.cache = None
+
+    def load(self) -> RESTRouteVersionMethod:
+        import_module(self.module)
+        method_route = self.route_version.method_routes[self.method]
+
+        if method_route is self:
+            raise exceptions.ConfigurationError(
+                "Stale route manifest: %s does not define %s %s @ %s" % (self.module, self.method, self.route_version.path, self.route_version.version)
+            )
+
+        return method_route
+
+    def __call__(self, request, *args, **kwargs):
+        return self.load()(request, *args, **kwargs)
+
+    def __str__(self):
+        return f"LazyRESTRouteVersionMethod({self.method} {self.route_version.path} @ {self.route_version.version}, module={self.module})"
+
+    __repr__ = __str__
+
+
 class RESTRouteVersion:
     get_cache = None
+    manifest_modules = None
+    _cors_headers = None
 
     def __init__(
             self,
@@ -266,14 +552,72 @@ class RESTRouteVersion:
         self.name = name
         self.route = RESTRoute.get_route(self.path)
         self.route.version_routes[self.version] = self
+        self.route.matching_version_routes.clear()
         self.method_routes = {}
 
     def head(self, request, *args, **kwargs):
+        if isinstance(self.get, LazyRESTRouteVersionMethod):
+            self.get.load()
+
         if not self.get_cache:
             return None
 
         return self.get_cache(request, *args, **kwargs)
 
+    def cors_headers(self) -> dict:
+        """
+        The Access-Control-Allow-* headers of this route, computed once after the method routes are registered
+        """
+        if self._cors_headers is None:
+            self._cors_headers = {
+                'Access-Control-Allow-Headers': 'Content-Type, Authorization',
+                'Access-Control-Allow-Credentials': 'true',
+                'Access-Control-Allow-Methods': ', '.join(self.method_routes.keys()),
+            }
+
+        return self._cors_headers
+
+    def preflight_origin(self, request) -> str:
+        """
+        The Access-Control-Allow-Origin of a preflight request, as allowed by the authentication of the method routes.
+        Returns None to use the default.
+        """
+        origin = request.headers.get('Origin')
+        if not origin:
+            return None
+
+        for method_route in list(self.method_routes.values()):
+            if isinstance(method_route, LazyRESTRouteVersionMethod):
+                method_route = method_route.load()
+
+            allowed_origin = method_route.auth.allowed_origin(origin)
+            if allowed_origin:
+                return allowed_origin
+
+        return None
+
+    def options(self, request, *args, **kwargs):
+        """
+        Answer CORS preflight requests using the precomputed headers, without authentication or database work
+        """
+        response = HttpResponse()
+        response['Allow'] = ', '.join(list(self.method_routes.keys()) + ['OPTIONS'])
+        response['Content-Length'] = '0'
+
+        for header, value in self.cors_headers().items():
+            response[header] = value
+
+        if app_settings.CORS_MAX_AGE:
+            response['Access-Control-Max-Age'] = str(app_settings.CORS_MAX_AGE)
+
+        if 'Origin' in request.headers:
+            response['Vary'] = 'Origin'
+            origin = self.preflight_origin(request)
+            if origin:
+                response['Access-Control-Allow-Origin'] = origin
+
+        return response
+
     def _default_method_handler(self, *args, **kwargs):
         return HttpResponse(status=405)
 
@@ -284,8 +628,14 @@ class RESTRouteVersion:
     delete = _default_method_handler
 
     def register_method_route(self, method_route: RESTRouteVersionMethod):
+        if self.manifest_modules and self.manifest_modules.get(method_route.method, method_route.route_func.__module__) != method_route.route_func.__module__:
+            # the manifest assigns this route to another module which overrides it
+            _logger.debug("Ignored rest route %r overridden in %s", method_route, self.manifest_modules[method_route.method])
+            return
+
         setattr(self, method_route.method.lower(), method_route)
         self.method_routes[method_route.method] = method_route
+        self._cors_headers = None
 
         if method_route.method == "GET" and method_route.cache:
             self.get_cache = method_route.cache
@@ -293,6 +643,19 @@ class RESTRouteVersion:
         if method_route.name and not self.name:
             self.name = method_route.name
 
+    def register_lazy_method_route(self, method: str, module: str):
+        """
+        Register a placeholder for a method route defined in `module`, which will be imported on the first request
+        """
+        if self.manifest_modules is None:
+            self.manifest_modules = {}
+
+        self.manifest_modules[method] = module
+        lazy_route = LazyRESTRouteVersionMethod(self, method, module)
+        setattr(self, method.lower(), lazy_route)
+        self.method_routes[method] = lazy_route
+        self._cors_headers = None
+
     def __str__(self):
         return f"RESTRouteVersion({self.path} @ {self.version})"
 
@@ -329,6 +692,7 @@ class RESTRoute:
         self.path = path
         self.name = name
         self.version_routes = {}
+        self.matching_version_routes = {}
 
         rest_routes[self.path] = self
 
@@ -339,7 +703,18 @@ class RESTRoute:
             return RESTRouteVersion(self.path, version, name)
 
 
-    def find_matching_version_route(self, version: float):
+    def find_matching_version_route(self, version: tuple):
+        try:
+            return self.matching_version_routes[version]
+        except KeyError:
+            if len(self.matching_version_routes) >= 256:
+                # the requested versions are client input, keep the memo bounded
+                self.matching_version_routes.clear()
+
+            version_route = self.matching_version_routes[version] = self._find_matching_version_route(version)
+            return version_route
+
+    def _find_matching_version_route(self, version: tuple):
         version_routes = list(filter(
             lambda vers: vers.matches(version),
             self.version_routes.keys()
@@ -389,7 +764,16 @@ class RESTRoute:
 
 
 class RESTRouteGroup:
-    pass
+    """
+    Base of classes grouping rest routes.
+    Set `lifecycle` to 'singleton' to share one instance per process instead of creating one per call,
+    see djsonrest.groups for the lifecycle and shared resources.
+    """
+
+    lifecycle = groups.REQUEST
+
+    def shutdown(self):
+        """ Called on shutdown for singleton groups """
 
 
 class RESTApp:
@@ -489,15 +873,34 @@ class RESTRouteDecorator:
             self.rest_dec = fn.rest_dec
             self.rest_route = RESTRouteVersionMethod(
                 fn,
-                self.rest_dec.path,
-                self.rest_dec.version,
-                self.rest_dec.method,
-                self.rest_dec.auth,
-                self.rest_dec.response_status,
-                self.rest_dec.cache,
-                self.rest_dec.name,
-                self.rest_dec.handled_exceptions,
-                self.rest_dec.response_modifier,
+                path=self.rest_dec.path,
+                version=self.rest_dec.version,
+                method=self.rest_dec.method,
+                auth=self.rest_dec.auth,
+                response_status=self.rest_dec.response_status,
+                cache=self.rest_dec.cache,
+                name=self.rest_dec.name,
+                handled_exceptions=self.rest_dec.handled_exceptions,
+                response_modifier=self.rest_dec.response_modifier,
+                max_body_size=self.rest_dec.max_body_size,
+                max_body_depth=self.rest_dec.max_body_depth,
+                body_schema=self.rest_dec.body_schema,
+                query_schema=self.rest_dec.query_schema,
+                fields=self.rest_dec.fields,
+                max_in_flight=self.rest_dec.max_in_flight,
+                queue_timeout=self.rest_dec.queue_timeout,
+                single_flight=self.rest_dec.single_flight,
+                vary_auth=self.rest_dec.vary_auth,
+                cache_timeout=self.rest_dec.cache_timeout,
+                stale_while_revalidate=self.rest_dec.stale_while_revalidate,
+                stale_if_error=self.rest_dec.stale_if_error,
+                cache_tags=self.rest_dec.cache_tags,
+                profile_rate=self.rest_dec.profile_rate,
+                query_budget=self.rest_dec.query_budget,
+                stream_body=self.rest_dec.stream_body,
+                read_replica=self.rest_dec.read_replica,
+                background=self.rest_dec.background,
+                idempotent=self.rest_dec.idempotent,
             )
             fn.rest_route = self.rest_route
 
@@ -533,7 +936,7 @@ class RESTRouteDecorator:
             if self.rest_dec.func_owner:
                 # wrap handler for use in class
                 _fn = fn
-                fn = lambda *args, **kwargs: _fn(self.rest_dec.func_owner(), *args, **kwargs)
+                fn = lambda *args, **kwargs: _fn(groups.instance(self.rest_dec.func_owner), *args, **kwargs)
 
             setattr(self.rest_route, handler, fn)
 
@@ -558,6 +961,25 @@ class RESTRouteDecorator:
             name: str = None,
             handled_exceptions: tuple = (),
             response_modifier: callable = None,
+            max_body_size: int = _default,
+            max_body_depth: int = _default,
+            body_schema: dict = None,
+            query_schema: dict = None,
+            fields: list = None,
+            max_in_flight: int = None,
+            queue_timeout: float = None,
+            single_flight: bool = False,
+            vary_auth: bool = True,
+            cache_timeout: int = None,
+            stale_while_revalidate: int = None,
+            stale_if_error: int = None,
+            cache_tags=None,
+            profile_rate: float = None,
+            query_budget: int = None,
+            stream_body: bool = False,
+            read_replica: bool = True,
+            background: bool = False,
+            idempotent: bool = False,
             app: RESTApp = None,
         ):
         """
@@ -572,6 +994,43 @@ class RESTRouteDecorator:
         cache: optional callable, only for GET requests, to determine if the ressource has changed.
                The callable has to return a django HTTPResponse containing an ETag or Last-Modified (or both) header
         name: Optional name for the django route. Same for all versions and methods
+        max_body_size: Maximum size of the (decompressed) request body in bytes, defaults to settings.REST_MAX_BODY_SIZE;
+                       None for no limit. The Content-Length header is checked against it before the body is read.
+        max_body_depth: Maximum nesting depth of the json request body, defaults to settings.REST_MAX_BODY_DEPTH;
+                        None for no limit
+        body_schema: Optional schema (see djsonrest.validation) to validate the json request body against.
+                     The validated data replaces request.JSON.
+        query_schema: Optional schema to validate and coerce the query parameters against.
+                      The validated data will be available in request.QUERY.
+        fields: Optional field spec (see djsonrest.serializers) used to serialize a QuerySet returned by the route
+        max_in_flight: Maximum number of requests to this route handled at the same time per process.
+                       Excess requests are rejected with a 503 response.
+        queue_timeout: Seconds an excess request may wait for a free slot before it is rejected
+        single_flight: Only for GET requests; concurrent identical requests wait for one call of the route function
+                       and share its response
+        vary_auth: Only share coalesced or cached responses between requests of the same authenticated client
+                   (Authorization header), default True
+        cache_timeout: Only for GET requests; seconds to store the response in the cache settings.REST_RESPONSE_CACHE
+        stale_while_revalidate: Seconds after the cache_timeout during which the stored response is returned
+                                while it is refreshed in the background
+        stale_if_error: Seconds after the cache_timeout during which the stored response is returned
+                        if the route function raises an exception
+        cache_tags: Only for GET requests; list of tags (formatted using the url arguments, e.g. 'book:{id}') or
+                    a callable returning them. Cached responses and ETags are invalidated using djsonrest.caching.invalidate()
+        profile_rate: Fraction of the requests to this route to profile, if settings.REST_PROFILE_DIR is set;
+                      defaults to settings.REST_PROFILE_SAMPLE_RATE
+        query_budget: Maximum number of database queries of a request to this route (including authentication),
+                      defaults to settings.REST_QUERY_BUDGET; checked for the requests sampled by
+                      settings.REST_QUERY_TRACKING_RATE
+        stream_body: Not for GET requests; request.JSON is an iterator of the items of the request body (a json array or
+                     newline delimited json), which are parsed incrementally while the body is read (see djsonrest.body).
+                     A body_schema is applied to each item.
+        read_replica: Only for GET requests; send the reads of the route function and cache function to a read replica
+                      (see djsonrest.routers), if settings.REST_DB_REPLICAS is set
+        background: Run the route function as background job (see djsonrest.jobs): the request is answered with
+                    202 Accepted and the id of the job, its response is returned by the job route once it is done
+        idempotent: Not for GET requests and not with stream_body; honor the Idempotency-Key header of the requests: the response to a key is
+                    stored and replayed for retried requests with the same key (see djsonrest.idempotency)
         """
 
         if path.startswith("/"):
@@ -586,6 +1045,25 @@ class RESTRouteDecorator:
         self.name = name
         self.handled_exceptions = handled_exceptions
         self.response_modifier = response_modifier
+        self.max_body_size = max_body_size
+        self.max_body_depth = max_body_depth
+        self.body_schema = body_schema
+        self.query_schema = query_schema
+        self.fields = fields
+        self.max_in_flight = max_in_flight
+        self.queue_timeout = queue_timeout
+        self.single_flight = single_flight
+        self.vary_auth = vary_auth
+        self.cache_timeout = cache_timeout
+        self.stale_while_revalidate = stale_while_revalidate
+        self.stale_if_error = stale_if_error
+        self.cache_tags = cache_tags
+        self.profile_rate = profile_rate
+        self.query_budget = query_budget
+        self.stream_body = stream_body
+        self.read_replica = read_replica
+        self.background = background
+        self.idempotent = idempotent
         self.app = app
 
     def __call__(self, fn):
@@ -605,6 +1083,25 @@ class RESTRouteDecoratorMethod(RESTRouteDecorator):
             cache: callable = None,
             name: str = None,
             handled_exceptions: tuple = (),
+            max_body_size: int = _default,
+            max_body_depth: int = _default,
+            body_schema: dict = None,
+            query_schema: dict = None,
+            fields: list = None,
+            max_in_flight: int = None,
+            queue_timeout: float = None,
+            single_flight: bool = False,
+            vary_auth: bool = True,
+            cache_timeout: int = None,
+            stale_while_revalidate: int = None,
+            stale_if_error: int = None,
+            cache_tags=None,
+            profile_rate: float = None,
+            query_budget: int = None,
+            stream_body: bool = False,
+            read_replica: bool = True,
+            background: bool = False,
+            idempotent: bool = False,
             app: RESTApp = None,
         ):
         super().__init__(
@@ -616,6 +1113,25 @@ class RESTRouteDecoratorMethod(RESTRouteDecorator):
             cache=cache,
             name=name,
             handled_exceptions=handled_exceptions,
+            max_body_size=max_body_size,
+            max_body_depth=max_body_depth,
+            body_schema=body_schema,
+            query_schema=query_schema,
+            fields=fields,
+            max_in_flight=max_in_flight,
+            queue_timeout=queue_timeout,
+            single_flight=single_flight,
+            vary_auth=vary_auth,
+            cache_timeout=cache_timeout,
+            stale_while_revalidate=stale_while_revalidate,
+            stale_if_error=stale_if_error,
+            cache_tags=cache_tags,
+            profile_rate=profile_rate,
+            query_budget=query_budget,
+            stream_body=stream_body,
+            read_replica=read_replica,
+            background=background,
+            idempotent=idempotent,
             app=app,
         )
 
@@ -680,6 +1196,52 @@ def remove(path: str, version: RESTVersion = None, method: str = None):
     _logger.debug('Removed route "%s", version=%s, method=%s', path, version or 'any', method or 'any')
 
 
+def _authentication_stage(method_route: RESTRouteVersionMethod):
+    if type(method_route.auth).response is rest_auth.Authentication.response:
+        return method_route.authenticate
+
+    return method_route.authenticate_response
+
+
+def _database_stage(method_route: RESTRouteVersionMethod):
+    if method_route.read_replica:
+        return method_route.use_read_replica
+
+    if app_settings.DB_REPLICAS and method_route.method != 'GET':
+        return method_route.stick_to_primary
+
+    return None
+
+
+def _body_stage(method_route: RESTRouteVersionMethod):
+    if method_route.method == 'GET':
+        return method_route.reject_body
+
+    if method_route.stream_body:
+        return method_route.stream_items
+
+    if method_route.body_validator or method_route.background:
+        # background jobs parse the body before the job is accepted
+        return method_route.validate_body
+
+    return method_route.lazy_body
+
+
+pipeline.register('concurrency', lambda method_route: method_route.limit_concurrency if method_route.concurrency_limit else None)
+pipeline.register('query_tracking', lambda method_route: method_route.track_queries if method_route.query_tracker else None)
+pipeline.register('profiling', lambda method_route: method_route.profile_sampled if method_route.profiler and method_route.profiler.rate else None)
+pipeline.register('authentication', _authentication_stage)
+pipeline.register('requested_profiling', lambda method_route: method_route.profile_requested if method_route.profiler and method_route.profiler.header else None)
+pipeline.register('database', _database_stage)
+pipeline.register('idempotency', lambda method_route: method_route.idempotent_response if method_route.idempotent else None)
+pipeline.register('response_modifier', lambda method_route: method_route.modify_response if method_route.response_modifier else None)
+pipeline.register('query', lambda method_route: method_route.validate_query if method_route.query_validator else None)
+pipeline.register('body', _body_stage)
+pipeline.register('conditional', lambda method_route: method_route.conditional_response if method_route.cache or method_route.cache_tags else None)
+pipeline.register('background', lambda method_route: method_route.run_in_background if method_route.background else None)
+pipeline.register('shared_response', lambda method_route: method_route.shared_route_response if method_route.response_cache or method_route.single_flight else None)
+
+
 route = RESTRouteDecorator
 
 get = RESTRouteDecoratorMethodGET
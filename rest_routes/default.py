@@ -1,5 +1,5 @@
 from django.conf import settings
-from djsonrest import rest
+from djsonrest import rest, exceptions, warmup
 
 
 class Default(rest.RESTRouteGroup):
@@ -10,3 +10,12 @@ class Default(rest.RESTRouteGroup):
             "author": getattr(settings, "AUTHOR", None),
             "version": getattr(settings, "GIT_VERSION_HEX", None),
         }
+
+    @rest.get('/ready', version=rest.RESTVersion(0.0, match=rest.RESTVersionMatch.FOLLOWING_MAJOR_MINOR), name='ready')
+    def ready(self, request, *args, **kwargs):
+        if not warmup.is_ready():
+            raise exceptions.ServiceUnavailableError("Warm-up not finished", code='not_ready', retry_after=1)
+
+        return {
+            "ready": True,
+        }
@@ -0,0 +1,7 @@
+from djsonrest import rest, jobs
+
+
+class Jobs(rest.RESTRouteGroup):
+    @rest.get('/jobs/<str:job_id>', version=rest.RESTVersion(0.0, match=rest.RESTVersionMatch.FOLLOWING_MAJOR_MINOR), name='rest_job', read_replica=False)
+    def job(self, request, job_id, *args, **kwargs):
+        return jobs.poll(request, job_id)
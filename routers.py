@@ -0,0 +1,92 @@
+"""
+Database routing of rest routes to read replicas.
+
+Add `djsonrest.routers.ReplicaRouter` to settings.DATABASE_ROUTERS and list the replica aliases in
+settings.REST_DB_REPLICAS. Queries of the route functions and cache functions of GET routes are sent to a replica,
+all other queries (authentication, non-GET routes, writes) to the primary database (settings.REST_DB_PRIMARY).
+
+After a successful non-GET request the client reads from the primary for settings.REST_DB_STICKY_SECONDS,
+so it sees its own writes. The stickiness is carried in a signed cookie and in a signed header
+(settings.REST_DB_STICKY_HEADER), which clients not supporting cookies send back; both are bound to the
+authenticated user or consumer.
+"""
+
+import random
+import contextlib
+import contextvars
+from django.core import signing
+from django.db import connections
+from . import app_settings, auth
+
+
+_SALT = 'djsonrest.routers.sticky'
+
+_replica = contextvars.ContextVar('djsonrest_replica', default=None)
+
+
+class ReplicaRouter:
+    """
+    Sends reads to the replica chosen for the current rest request, if any
+    """
+
+    def db_for_read(self, model, **hints):
+        replica = _replica.get()
+        if replica is None or connections[app_settings.DB_PRIMARY].in_atomic_block:
+            return None
+
+        return replica
+
+    def db_for_write(self, model, **hints):
+        return app_settings.DB_PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {app_settings.DB_PRIMARY, *app_settings.DB_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+
+        return None
+
+
+def is_sticky(request) -> bool:
+    """ Whether the client wrote recently, so it has to read from the primary """
+    max_age = app_settings.DB_STICKY_SECONDS
+    identity = auth.identity(request)
+
+    if request.get_signed_cookie(app_settings.DB_STICKY_COOKIE, default=None, salt=_SALT, max_age=max_age) == identity:
+        return True
+
+    token = request.headers.get(app_settings.DB_STICKY_HEADER)
+    if token:
+        try:
+            return signing.loads(token, salt=_SALT, max_age=max_age) == identity
+        except signing.BadSignature:
+            pass
+
+    return False
+
+
+@contextlib.contextmanager
+def replica(request):
+    """
+    Send the reads inside the block to a randomly chosen replica, unless the client is sticky to the primary
+    """
+    if is_sticky(request):
+        yield None
+        return
+
+    alias = random.choice(app_settings.DB_REPLICAS)
+    token = _replica.set(alias)
+    try:
+        yield alias
+    finally:
+        _replica.reset(token)
+
+
+def mark_written(request, response):
+    """ Make the client read from the primary for the next settings.REST_DB_STICKY_SECONDS """
+    identity = auth.identity(request)
+    response.set_signed_cookie(
+        app_settings.DB_STICKY_COOKIE, identity, salt=_SALT,
+        max_age=app_settings.DB_STICKY_SECONDS, httponly=True, samesite='Lax',
+    )
+    response[app_settings.DB_STICKY_HEADER] = signing.dumps(identity, salt=_SALT)
@@ -0,0 +1,132 @@
+"""
+Compiled serializers for QuerySets returned by rest routes.
+
+A field spec is a list of field names / lookups, (output_key, lookup) tuples or dicts mapping a relation name to the
+field spec of the related model:
+
+    ['id', 'username', ('group', 'group__name'), {'profile': ['bio']}, {'tags': ['id', 'name']}]
+
+Forward relations (ForeignKey, OneToOne) are joined into the main query, reverse and many-to-many relations are
+loaded with one additional query per relation. No model instances are created; the rows are converted into dicts by
+a function generated for the spec.
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import QuerySet
+from . import exceptions
+
+
+PREFETCH_CHUNK_SIZE = 900
+
+
+def _is_many(model, name):
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist as error:
+        raise exceptions.ConfigurationError("Unknown relation %r on %s" % (name, model.__name__)) from error
+
+    if not field.is_relation:
+        raise exceptions.ConfigurationError("%r on %s is not a relation" % (name, model.__name__))
+
+    return field.many_to_many or field.one_to_many, field.related_model
+
+
+class _Plan:
+    """
+    The compiled query plan and row converter of a field spec for a single model.
+    """
+
+    def __init__(self, model, spec, prefix: str = ""):
+        self.lookups = ['pk']
+        self.many = []  # (relation name, _Plan of the related model)
+        self.namespace = {}
+        self.source = 'def convert(row, many):\n    return %s\n' % self._expression(model, spec, prefix)
+        exec(compile(self.source, '<djsonrest serializer>', 'exec'), self.namespace) # pylint: disable=exec-used
+        self.convert = self.namespace['convert']
+
+    def _index(self, lookup):
+        try:
+            return self.lookups.index(lookup)
+        except ValueError:
+            self.lookups.append(lookup)
+            return len(self.lookups) - 1
+
+    def _expression(self, model, spec, prefix):
+        items = []
+        for entry in spec:
+            if isinstance(entry, dict):
+                for name, sub_spec in entry.items():
+                    many, related_model = _is_many(model, name)
+                    if many:
+                        if prefix:
+                            raise exceptions.ConfigurationError("Nested many relations are not supported (%s%s)" % (prefix, name))
+
+                        plan = _Plan(related_model, sub_spec)
+                        if plan.many:
+                            raise exceptions.ConfigurationError("Nested many relations are not supported (%s)" % name)
+
+                        items.append('%r: many[%i].get(row[0], [])' % (name, len(self.many)))
+                        self.many.append((name, plan))
+
+                    else:
+                        null_index = self._index('%s%s__pk' % (prefix, name))
+                        expression = self._expression(related_model, sub_spec, '%s%s__' % (prefix, name))
+                        items.append('%r: None if row[%i] is None else %s' % (name, null_index, expression))
+
+                continue
+
+            if isinstance(entry, tuple):
+                key, lookup = entry
+            else:
+                key = lookup = entry
+
+            items.append('%r: row[%i]' % (key, self._index(prefix + lookup)))
+
+        return '{%s}' % ', '.join(items)
+
+    def serialize(self, queryset: QuerySet) -> list:
+        rows = list(queryset.values_list(*self.lookups))
+        many = []
+
+        for name, plan in self.many:
+            related = {}
+            many.append(related)
+            lookups = ['pk'] + ['%s__%s' % (name, lookup) for lookup in plan.lookups]
+            pks = [row[0] for row in rows]
+
+            for start in range(0, len(pks), PREFETCH_CHUNK_SIZE):
+                chunk = queryset.model._base_manager.filter(pk__in=pks[start:start + PREFETCH_CHUNK_SIZE])
+                for related_row in chunk.values_list(*lookups):
+                    if related_row[1] is None:
+                        continue
+
+                    related.setdefault(related_row[0], []).append(plan.convert(related_row[1:], ()))
+
+        convert = self.convert
+        return [convert(row, many) for row in rows]
+
+
+class QuerySetSerializer:
+    """
+    Serializes a QuerySet into a list of dicts according to the field spec.
+    The spec is compiled once per model on first use.
+    """
+
+    def __init__(self, fields: list):
+        self.fields = fields
+        self._plans = {}
+
+    def plan(self, model) -> _Plan:
+        try:
+            return self._plans[model]
+        except KeyError:
+            plan = self._plans[model] = _Plan(model, self.fields)
+            return plan
+
+    def __call__(self, queryset: QuerySet) -> list:
+        return self.plan(queryset.model).serialize(queryset)
+
+    def __str__(self):
+        return f"QuerySetSerializer({self.fields})"
+
+    __repr__ = __str__
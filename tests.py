@@ -1,3 +1,611 @@
-from django.test import TestCase
+import os
+import json
+import gzip
+import time
+import asyncio
+import logging
+import pstats
+import tempfile
+import threading
+from unittest import mock
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import connections
+from django.http import QueryDict
+from django.http.response import HttpResponse
+from django.contrib.auth.models import Group, Permission, User
+from django.test import SimpleTestCase, TestCase, RequestFactory, override_settings
+from . import rest, app_settings, auth, caching, exceptions, handlers, jobs, logs, middleware, profiling, routers, serializers, warmup, validation, body as rest_body
 
-# Create your tests here.
+
+@rest.post('/tests/echo', version=1.0)
+def echo(request):
+    return request.JSON
+
+
+USER_SCHEMA = {
+    'username': validation.Field(str, max_length=8),
+    'age': validation.Field(int, required=False, min_value=0),
+    'role': validation.Field(str, required=False, default='user', choices=('user', 'admin')),
+    'tags': validation.Field(list, items=str, required=False),
+    'address': {'city': str, 'zip': validation.Field(str, null=True)},
+}
+
+
+@rest.post('/tests/users', version=1.0, body_schema=USER_SCHEMA)
+def users_post(request):
+    return request.JSON
+
+
+@rest.get('/tests/users', version=1.0, query_schema={
+    'limit': validation.Field(int, required=False, default=10, max_value=100),
+    'active': validation.Field(bool, required=False),
+    'ids': validation.Field(list, items=int, required=False),
+})
+def users_get(request):
+    return request.QUERY
+
+
+@rest.get('/tests/members', version=1.0, fields=['id', ('name', 'username'), {'groups': ['name']}])
+def members(request):
+    return User.objects.order_by('pk')
+
+
+orders = []
+
+
+@rest.post('/tests/orders', version=1.0, idempotent=True)
+def order(request):
+    orders.append(request.JSON)
+    time.sleep(0.2)
+    return {'order': len(orders)}
+
+
+coalesced_calls = []
+
+
+@rest.get('/tests/coalesced', version=1.0, single_flight=True)
+def coalesced(request):
+    coalesced_calls.append(request)
+    time.sleep(0.1)
+    return len(coalesced_calls)
+
+
+class HeaderUser(auth.Authentication):
+    """ Authenticates the user whose id is sent in the X-Test-User header """
+
+    def authenticate(self, request):
+        request.user = User(pk=int(request.headers['X-Test-User']))
+
+    def response(self, request, response):
+        response['X-Test-User'] = request.user.pk
+        return response
+
+
+class Reports(rest.RESTRouteGroup):
+    @rest.post('/tests/reports', version=1.0, auth=HeaderUser, background=True, body_schema={'year': int})
+    def report(self, request):
+        if request.JSON['year'] < 2000:
+            raise exceptions.RequestError("No report before 2000", code='too_early')
+
+        return {'report': request.JSON['year']}
+
+    @report.response_modifier
+    def mark_modified(self, request, response):
+        response['X-Test-Modified'] = 'true'
+        return response
+
+
+class RequestBodyTest(SimpleTestCase):
+    def post(self, body):
+        request = RequestFactory().post('/api/1.0/tests/echo', json.dumps(body), content_type='application/json')
+        return rest.rest_routes['tests/echo'].version_routes[rest.RESTVersion(1.0)].post(request)
+
+    def test_json_round_trip(self):
+        for body in ({'a': 1, 'b': [1, 2]}, [1, {'c': None}]):
+            response = self.post(body)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.content), {'data': body})
+
+    def test_compressed_body_limits(self):
+        body = gzip.compress(json.dumps({'a': ' ' * 1024 * 1024}).encode())
+        request = RequestFactory().post('/api/1.0/tests/echo', body, content_type='application/json', HTTP_CONTENT_ENCODING='gzip')
+        with self.assertRaises(exceptions.PayloadTooLargeError):
+            rest_body.read_body(request)
+
+        with mock.patch.object(app_settings, 'MAX_COMPRESSION_RATIO', None):
+            self.assertEqual(len(rest_body.read_body(request)), 1024 * 1024 + 9)
+
+        with self.assertRaises(exceptions.PayloadTooLargeError):
+            rest_body.read_body(request, max_size=1024)
+
+    def test_json_array_separators(self):
+        self.assertEqual(list(rest_body.iter_json_array([b'[1, ', b'2]'])), [1, 2])
+        self.assertEqual(list(rest_body.iter_json_array([b'[ ]'])), [])
+        for body in (b'[1,]', b'[,]', b'[,1]', b'[1,,2]', b'[1 2]'):
+            with self.subTest(body=body), self.assertRaises(exceptions.EncodingError):
+                list(rest_body.iter_json_array([body]))
+
+
+class WarmupTest(SimpleTestCase):
+    def test_ready_without_warmup(self):
+        with mock.patch.object(app_settings, 'WARMUP', False):
+            self.assertTrue(warmup.is_ready())
+
+    def test_warmup_on_application_load(self):
+        with mock.patch.object(app_settings, 'WARMUP', True), mock.patch.object(warmup, 'run') as run:
+            middleware.RESTRoutesMiddleware(lambda request: None)
+
+        run.assert_called_once_with()
+
+
+class ProfilingTest(SimpleTestCase):
+    def test_header_requires_permission(self):
+        def handle(request):
+            return None
+
+        profiler = profiling.RouteProfiler('GET tests', rate=0)
+        request = RequestFactory().get('/api/1.0/tests', HTTP_X_REST_PROFILE='1')
+        with mock.patch.object(profiler, 'run') as run:
+            with mock.patch.object(profiler, 'permission', return_value=False):
+                profiler.requested(request, handle)
+            run.assert_not_called()
+
+            with mock.patch.object(profiler, 'permission', return_value=True):
+                profiler.requested(request, handle)
+            run.assert_called_once_with(request, profiling.REQUESTED, handle)
+
+    def test_sampled_before_authentication(self):
+        def profiled(request):
+            return None
+
+        with tempfile.TemporaryDirectory() as directory, mock.patch.object(app_settings, 'PROFILE_DIR', directory):
+            rest.get('/tests/profiled', version=1.0, auth=HeaderUser, profile_rate=1)(profiled)
+            self.addCleanup(rest.remove, '/tests/profiled')
+            route = rest.rest_routes['tests/profiled'].version_routes[rest.RESTVersion(1.0)].method_routes['GET']
+
+            request = RequestFactory().get('/api/1.0/tests/profiled', HTTP_X_TEST_USER='1', HTTP_X_REST_PROFILE='1')
+            with mock.patch.object(route.profiler, 'permission', return_value=True):
+                response = route(request)
+
+            self.assertEqual(route.stages[:3], ['profiling', 'authentication', 'requested_profiling'])
+            functions = {function for _file, _line, function in pstats.Stats('%s/%s' % (directory, response['X-Rest-Profile'])).stats}
+            self.assertIn('authenticate', functions)
+            self.assertEqual(len(os.listdir(directory)), 1)
+
+
+class HandlerTest(SimpleTestCase):
+    def test_lean_middleware(self):
+        with self.settings(MIDDLEWARE=['django.middleware.clickjacking.XFrameOptionsMiddleware']):
+            with mock.patch.object(type(settings._wrapped), '__setattr__', side_effect=AssertionError("settings changed")): # pylint: disable=protected-access
+                handler = handlers.RESTWSGIHandler()
+
+            response = handler.get_response(RequestFactory().get('/api/1.0/'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Frame-Options', response)
+
+
+class RouteOptionsTest(SimpleTestCase):
+    def test_idempotent_stream_body(self):
+        with self.assertRaises(exceptions.InvalidRouteError):
+            @rest.post('/tests/stream', version=1.0, idempotent=True, stream_body=True)
+            def stream(request):
+                return None
+
+    def test_body_limits(self):
+        def upload(request):
+            return None
+
+        for options, limits in (({}, (app_settings.MAX_BODY_SIZE, app_settings.MAX_BODY_DEPTH)),
+                                ({'max_body_size': 1024, 'max_body_depth': 8}, (1024, 8)),
+                                ({'max_body_size': None, 'max_body_depth': None}, (None, None))):
+            with self.subTest(options=options):
+                route = rest.RESTRouteVersionMethod(upload, path='/tests/upload', version=1.0, method='POST', **options)
+                self.assertEqual((route.max_body_size, route.max_body_depth), limits)
+
+
+class LogsTest(SimpleTestCase):
+    def test_caller_info(self):
+        logger = logging.getLogger('djsonrest.tests')
+        with mock.patch.object(app_settings, 'LOG_ASYNC', False), self.assertLogs(logger) as captured:
+            logs.log(logger, logging.INFO, "logged %s", 1)
+
+        record = captured.records[0]
+        self.assertEqual((record.pathname, record.funcName, record.getMessage()), (__file__, 'test_caller_info', "logged 1"))
+
+    def test_dropped_records(self):
+        logger = logging.getLogger('djsonrest.tests')
+        with mock.patch.object(app_settings, 'LOG_ASYNC', True), mock.patch.object(logs, 'dropped', 3), \
+                mock.patch.object(logs, '_records') as records:
+            logs.log(logger, logging.WARNING, "queue 100% full")
+            logs.log(logger, logging.WARNING, "queue %s", "drained")
+
+        first, second = [call[0][0] for call in records().put_nowait.call_args_list]
+        self.assertEqual((first.getMessage(), first.rest_dropped), ("queue 100% full - 3 records dropped before", 3))
+        self.assertEqual(second.getMessage(), "queue drained")
+
+    def test_error_response_logged_once(self):
+        request = RequestFactory().get('/api/1.0/tests/echo')
+        request.rest_request = rest.rest_routes['tests/echo'].version_routes[rest.RESTVersion(1.0)].post
+        with mock.patch.object(logs, 'log_error') as log_error:
+            response = middleware.exception_response(request, exceptions.AuthenticationError())
+
+        log_error.assert_called_once()
+        self.assertTrue(response._has_been_logged) # pylint: disable=protected-access
+
+
+class CoalescingTest(SimpleTestCase):
+    route = rest.rest_routes['tests/coalesced'].version_routes[rest.RESTVersion(1.0)].get
+
+    def setUp(self):
+        coalesced_calls.clear()
+
+    def request(self, user=None):
+        request = RequestFactory().get('/api/1.0/tests/coalesced', HTTP_AUTHORIZATION='Bearer same')
+        request.user = user or mock.Mock(is_authenticated=True, pk=1)
+        return request
+
+    def test_request_key_varies_by_client(self):
+        self.assertEqual(self.route.request_key(self.request()), self.route.request_key(self.request()))
+        self.assertNotEqual(self.route.request_key(self.request()), self.route.request_key(self.request(mock.Mock(is_authenticated=True, pk=2))))
+
+    def test_threads_coalesced(self):
+        responses = []
+        threads = [threading.Thread(target=lambda: responses.append(self.route(self.request()))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(coalesced_calls), 1)
+        self.assertEqual([json.loads(response.content) for response in responses], [{'data': 1}] * 4)
+
+    def test_clients_not_coalesced(self):
+        users = [mock.Mock(is_authenticated=True, pk=pk) for pk in range(2)]
+        threads = [threading.Thread(target=self.route, args=(self.request(user),)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(coalesced_calls), 2)
+
+    def test_asgi_not_coalesced(self):
+        # django runs synchronous views one after another in a single thread under ASGI, they never overlap
+        application = handlers.RESTASGIHandler()
+
+        async def get():
+            messages = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def send(message):
+                messages.append(message)
+
+            scope = {'type': 'http', 'method': 'GET', 'path': '/api/1.0/tests/coalesced', 'query_string': b'', 'headers': [], 'server': ('testserver', 80)}
+            await application(scope, receive, send)
+            return messages[0]['status']
+
+        async def get_all():
+            return await asyncio.gather(*(get() for _ in range(3)))
+
+        self.assertEqual(asyncio.run(get_all()), [200] * 3)
+        self.assertEqual(len(coalesced_calls), 3)
+
+
+class ResponseCacheTest(SimpleTestCase):
+    def test_stale_if_error(self):
+        class Handled(Exception):
+            pass
+
+        response_cache = caching.ResponseCache('tests stale', timeout=0, stale_if_error=60, handled_exceptions=(Handled,))
+        request = RequestFactory().get('/api/1.0/tests/stale')
+        response_cache.get(request, 'key', lambda request: HttpResponse(b'stored'))
+
+        def fail(error):
+            def compute(request):
+                raise error
+
+            return compute
+
+        self.assertEqual(response_cache.get(request, 'key', fail(ValueError("database down"))).content, b'stored')
+        for error in (ObjectDoesNotExist(), exceptions.RequestError(), exceptions.AuthenticationError(), Handled()):
+            with self.subTest(error=error), self.assertRaises(error.__class__):
+                response_cache.get(request, 'key', fail(error))
+
+
+@mock.patch.object(app_settings, 'IDEMPOTENCY_WAIT', 0.1)
+class IdempotencyTest(SimpleTestCase):
+    route = rest.rest_routes['tests/orders'].version_routes[rest.RESTVersion(1.0)].post
+
+    def setUp(self):
+        orders.clear()
+        self.key = 'key-%s' % self.id()
+
+    def post(self, body, results=None):
+        request = RequestFactory().post('/api/1.0/tests/orders', json.dumps(body), content_type='application/json', HTTP_IDEMPOTENCY_KEY=self.key)
+        try:
+            response = self.route(request)
+        except exceptions.Error as error:
+            response = error
+
+        if results is not None:
+            results.append(response)
+
+        return response
+
+    def post_concurrently(self, *bodies) -> list:
+        results = []
+        threads = [threading.Thread(target=self.post, args=(body, results)) for body in bodies]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return results
+
+    def test_replay(self):
+        first = self.post({'item': 'a'})
+        replayed = self.post({'item': 'a'})
+
+        self.assertEqual(len(orders), 1)
+        self.assertEqual(replayed.content, first.content)
+        self.assertNotIn('Idempotent-Replayed', first)
+        self.assertEqual(replayed['Idempotent-Replayed'], 'true')
+
+    def test_concurrent_replay(self):
+        responses = self.post_concurrently(*[{'item': 'a'}] * 3)
+
+        self.assertEqual(len(orders), 1)
+        self.assertEqual(sorted(response.get('Idempotent-Replayed', '') for response in responses), ['', 'true', 'true'])
+        self.assertEqual(len(set(response.content for response in responses)), 1)
+
+    def test_reused_key(self):
+        self.post({'item': 'a'})
+        error = self.post({'item': 'b'})
+
+        self.assertIsInstance(error, exceptions.UnprocessableEntityError)
+        self.assertEqual(error.code, 'idempotency_key_reused')
+        self.assertEqual(len(orders), 1)
+
+    def test_in_progress(self):
+        results = self.post_concurrently({'item': 'a'}, {'item': 'b'})
+        errors = [result for result in results if isinstance(result, exceptions.Error)]
+
+        self.assertEqual(len(orders), 1)
+        self.assertEqual([(error.status_code, error.code) for error in errors], [(409, 'idempotency_key_in_use')])
+
+
+class ValidationTest(SimpleTestCase):
+    routes = rest.rest_routes['tests/users'].version_routes[rest.RESTVersion(1.0)]
+    user = {'username': 'ada', 'age': 36, 'tags': ['a'], 'address': {'city': 'London', 'zip': None}, 'other': 1}
+
+    def test_valid_body(self):
+        request = RequestFactory().post('/api/1.0/tests/users', json.dumps(self.user), content_type='application/json')
+        response = self.routes.post(request)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['data'], {
+            'username': 'ada', 'age': 36, 'role': 'user', 'tags': ['a'], 'address': {'city': 'London', 'zip': None},
+        })
+
+    def test_invalid_body(self):
+        validate = validation.compile_schema(USER_SCHEMA)
+        cases = (
+            ({'age': 1}, 'required'),
+            (dict(self.user, username='   '), 'required'),
+            (dict(self.user, username='ada lovelace'), 'too_long'),
+            (dict(self.user, age=True), 'invalid_type'),
+            (dict(self.user, age=-1), 'too_small'),
+            (dict(self.user, role='root'), 'invalid_choice'),
+            (dict(self.user, tags=[1]), 'invalid_type'),
+            (dict(self.user, address={'zip': '1'}), 'required'),
+            (dict(self.user, address=[]), 'invalid_type'),
+            ([], 'invalid_type'),
+        )
+        for data, code in cases:
+            with self.subTest(data=data), self.assertRaises(exceptions.RequestError) as context:
+                validate(data)
+
+            self.assertEqual((context.exception.code, context.exception.status_code), (code, 400))
+
+        request = RequestFactory().post('/api/1.0/tests/users', json.dumps({'age': 1}), content_type='application/json')
+        with self.assertRaises(exceptions.RequestError):
+            self.routes.post(request)
+
+    def test_query(self):
+        response = self.routes.get(RequestFactory().get('/api/1.0/tests/users', {'limit': '5', 'active': 'yes', 'ids': ['1', '2']}))
+        self.assertEqual(json.loads(response.content)['data'], {'limit': 5, 'active': True, 'ids': [1, 2]})
+
+        validate = validation.compile_schema({'limit': validation.Field(int, required=False, default=10, max_value=100)}, coerce=True)
+        self.assertEqual(validate(QueryDict('')), {'limit': 10})
+        for query, code in (('limit=x', 'invalid_type'), ('limit=101', 'too_large')):
+            with self.subTest(query=query), self.assertRaises(exceptions.RequestError) as context:
+                validate(QueryDict(query))
+
+            self.assertEqual(context.exception.code, code)
+
+
+class SerializerTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff, cls.editors = Group.objects.create(name='staff'), Group.objects.create(name='editors')
+        cls.ada = User.objects.create(username='ada')
+        cls.ada.groups.set([cls.staff, cls.editors])
+        cls.bob = User.objects.create(username='bob')
+
+    def test_many_relation(self):
+        with self.assertNumQueries(2):
+            response = rest.rest_routes['tests/members'].version_routes[rest.RESTVersion(1.0)].get(RequestFactory().get('/api/1.0/tests/members'))
+
+        data = json.loads(response.content)['data']
+        self.assertEqual([(user['id'], user['name'], sorted(group['name'] for group in user['groups'])) for user in data], [
+            (self.ada.pk, 'ada', ['editors', 'staff']),
+            (self.bob.pk, 'bob', []),
+        ])
+
+    def test_forward_relation(self):
+        serialize = serializers.QuerySetSerializer(['codename', {'content_type': ['app_label', ('name', 'model')]}])
+        permissions = Permission.objects.filter(codename='add_user')
+
+        with self.assertNumQueries(1):
+            data = serialize(permissions)
+
+        self.assertEqual(data, [{'codename': 'add_user', 'content_type': {'app_label': 'auth', 'name': 'user'}}])
+
+    def test_invalid_spec(self):
+        for fields in (['id', {'nothing': ['id']}], ['id', {'username': ['id']}], [{'groups': [{'permissions': ['id']}]}]):
+            with self.subTest(fields=fields), self.assertRaises(exceptions.ConfigurationError):
+                serializers.QuerySetSerializer(fields)(User.objects.all())
+
+
+@override_settings(DATABASE_ROUTERS=['djsonrest.routers.ReplicaRouter'])
+class ReplicaRoutingTest(SimpleTestCase):
+    databases = {'default'}
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # the replica is a second sqlite database, added after the test runner set up its databases
+        cls.directory = tempfile.TemporaryDirectory()
+        connections.databases['replica'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': '%s/replica.sqlite3' % cls.directory.name}
+        connections.ensure_defaults('replica')
+        connections.prepare_test_settings('replica')
+
+        with connections['replica'].schema_editor() as editor:
+            editor.create_model(User)
+        User.objects.using('replica').bulk_create([User(username='ada'), User(username='bob')])
+        cls.primary_user = User.objects.create(username='cyd')
+
+        cls.replicas = mock.patch.object(app_settings, 'DB_REPLICAS', ['replica'])
+        cls.replicas.start()
+        rest.get('/tests/replica', version=1.0)(lambda request: User.objects.count())
+        rest.post('/tests/replica', version=1.0)(lambda request: None)
+        cls.route = rest.rest_routes['tests/replica'].version_routes[rest.RESTVersion(1.0)]
+
+    @classmethod
+    def tearDownClass(cls):
+        rest.remove('/tests/replica')
+        cls.replicas.stop()
+        cls.primary_user.delete()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.databases['replica']
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def count(self, user=None, **headers) -> int:
+        request = self.factory.get('/api/1.0/tests/replica', **headers)
+        if user is not None:
+            request.user = user
+        return json.loads(self.route.get(request).content)['data']
+
+    def write(self):
+        response = self.route.post(self.factory.post('/api/1.0/tests/replica'))
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_reads_from_replica(self):
+        self.assertEqual(self.count(), 2)
+
+    def test_sticky_cookie(self):
+        response = self.write()
+
+        self.factory.cookies[app_settings.DB_STICKY_COOKIE] = response.cookies[app_settings.DB_STICKY_COOKIE].value
+        self.assertEqual(self.count(), 1)
+        self.assertEqual(self.count(user=self.primary_user), 2)
+
+        self.factory.cookies[app_settings.DB_STICKY_COOKIE] = 'tampered'
+        self.assertEqual(self.count(), 2)
+
+    def test_sticky_header(self):
+        token = self.write()[app_settings.DB_STICKY_HEADER]
+        header = 'HTTP_%s' % app_settings.DB_STICKY_HEADER.upper().replace('-', '_')
+
+        self.assertEqual(self.count(**{header: token}), 1)
+        self.assertEqual(self.count(**{header: token + 'x'}), 2)
+        self.assertEqual(self.count(user=self.primary_user, **{header: token}), 2)
+
+    def test_sticky_expires(self):
+        token = self.write()[app_settings.DB_STICKY_HEADER]
+        header = 'HTTP_%s' % app_settings.DB_STICKY_HEADER.upper().replace('-', '_')
+
+        with mock.patch.object(app_settings, 'DB_STICKY_SECONDS', -1):
+            self.assertEqual(self.count(**{header: token}), 2)
+
+    def test_writes_go_to_primary(self):
+        with routers.replica(self.factory.get('/')) as alias:
+            self.assertEqual(alias, 'replica')
+            self.assertEqual(User.objects.count(), 2)
+            user = User.objects.create(username='dan')
+
+        self.assertEqual(user._state.db, 'default')
+        user.delete()
+
+
+class JobsTest(SimpleTestCase):
+    route = rest.rest_routes['tests/reports'].version_routes[rest.RESTVersion(1.0)].post
+
+    def setUp(self):
+        patcher = mock.patch.object(jobs, '_store', jobs.LocalJobStore())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def submit(self, body, user=1):
+        request = RequestFactory().post('/api/1.0/tests/reports', body, content_type='application/json', HTTP_X_TEST_USER=str(user))
+        return self.route(request)
+
+    def poll(self, location, user=1):
+        return jobs.poll(RequestFactory().get(location, HTTP_X_TEST_USER=str(user)), location.rsplit('/', 1)[1])
+
+    def result(self, location):
+        for _ in range(100):
+            response = self.poll(location)
+            if response.status_code != 202:
+                return response
+            time.sleep(0.01)
+
+        self.fail("Job did not finish")
+
+    def test_lifecycle(self):
+        response = self.submit(json.dumps({'year': 2020}))
+        job = json.loads(response.content)['data']
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response['Location'], '/api/1.0/jobs/%s' % job['job'])
+        self.assertEqual(response['Retry-After'], str(app_settings.JOB_POLL_INTERVAL))
+
+        result = self.result(response['Location'])
+        self.assertEqual(result.status_code, 200)
+        self.assertEqual(json.loads(result.content), {'data': {'report': 2020}})
+        self.assertEqual((result['X-Test-User'], result['X-Test-Modified']), ('1', 'true'))
+
+    def test_failed_job(self):
+        result = self.result(self.submit(json.dumps({'year': 1999}))['Location'])
+
+        self.assertEqual(result.status_code, 400)
+        self.assertEqual(json.loads(result.content)['error']['code'], 'too_early')
+
+    def test_other_client(self):
+        location = self.submit(json.dumps({'year': 2020}))['Location']
+        self.result(location)
+
+        with self.assertRaises(jobs.JobDoesNotExist):
+            self.poll(location, user=2)
+
+        with self.assertRaises(jobs.JobDoesNotExist):
+            self.poll('/api/1.0/jobs/unknown')
+
+    def test_invalid_body(self):
+        with mock.patch.object(jobs, 'submit') as submit:
+            with self.assertRaises(exceptions.EncodingError):
+                self.submit('{"year": ')
+            with self.assertRaises(exceptions.RequestError):
+                self.submit(json.dumps({'year': 'last'}))
+
+        submit.assert_not_called()
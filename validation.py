@@ -0,0 +1,263 @@
+"""
+Declarative validation of request bodies and query parameters.
+
+A schema is a dict mapping the field names to a type (str, int, float, bool, dict, list) or to a `Field`.
+Schemas are compiled once into a specialized python function, which checks and coerces all fields in a single pass.
+"""
+
+from . import exceptions
+
+
+_missing = object()
+
+_TRUE_VALUES = frozenset(('1', 'true', 'yes', 'on'))
+_FALSE_VALUES = frozenset(('0', 'false', 'no', 'off'))
+
+
+class Field:
+    """
+    Declaration of a single field of a schema.
+
+    :param type: Expected type of the value (str, int, float, bool, dict or list)
+    :param required: The field has to be set with a value (strings consisting of whitespace only count as not set)
+    :param default: Value (or callable returning the value) to use if the field is not set.
+                    If no default is given, the field will be omitted in the validated data.
+    :param null: Allow None as value
+    :param choices: Allowed values
+    :param min_value, max_value: Bounds for int and float values
+    :param min_length, max_length: Bounds for the length of str and list values
+    :param source: Key of the field in the request data, if it differs from the key in the validated data
+    :param schema: Schema of the value for fields of type dict
+    :param items: Type or `Field` of the values for fields of type list
+    """
+
+    TYPES = (str, int, float, bool, dict, list)
+
+    def __init__(
+            self,
+            type=str, # pylint: disable=redefined-builtin
+            required: bool = True,
+            default=_missing,
+            null: bool = False,
+            choices=None,
+            min_value=None,
+            max_value=None,
+            min_length: int = None,
+            max_length: int = None,
+            source: str = None,
+            schema: dict = None,
+            items=None,
+        ):
+        if type not in self.TYPES:
+            raise exceptions.InvalidRouteError("Unsupported field type %r" % type)
+
+        if schema is not None and type is not dict:
+            raise exceptions.InvalidRouteError("A schema can only be defined for fields of type dict")
+
+        if items is not None and type is not list:
+            raise exceptions.InvalidRouteError("Items can only be defined for fields of type list")
+
+        self.type = type
+        self.required = required
+        self.default = default
+        self.null = null
+        self.choices = frozenset(choices) if choices is not None else None
+        self.min_value = min_value
+        self.max_value = max_value
+        self.min_length = min_length
+        self.max_length = max_length
+        self.source = source
+        self.schema = schema
+        self.items = as_field(items) if items is not None else None
+
+    def __str__(self):
+        return f"Field({self.type.__name__}, required={self.required})"
+
+    __repr__ = __str__
+
+
+def as_field(spec) -> Field:
+    if isinstance(spec, Field):
+        return spec
+
+    if isinstance(spec, dict):
+        return Field(dict, schema=spec)
+
+    return Field(spec)
+
+
+def _error(path, code, message):
+    return exceptions.RequestError(message % path, code=code)
+
+
+class _SchemaCompiler:
+    """
+    Generates the source code of the validator functions for a schema.
+    Nested schemas and list items are compiled into separate functions.
+    """
+
+    def __init__(self, coerce: bool = False):
+        self.coerce = coerce
+        self.namespace = {
+            '_missing': _missing,
+            '_error': _error,
+            '_true': _TRUE_VALUES,
+            '_false': _FALSE_VALUES,
+        }
+        self.functions = []
+        self._counter = 0
+
+    def constant(self, value):
+        self._counter += 1
+        name = '_c%i' % self._counter
+        self.namespace[name] = value
+        return name
+
+    def compile_schema(self, schema: dict, path: str = "", coerce: bool = None) -> str:
+        coerce = self.coerce if coerce is None else coerce
+        self._counter += 1
+        func_name = '_validate%i' % self._counter
+        lines = [
+            'def %s(data):' % func_name,
+            '    if not isinstance(data, dict):',
+            '        raise _error(%r, "invalid_type", "%%s has to be an object")' % (path or "Request data"),
+            '    result = {}',
+        ]
+
+        for key, spec in schema.items():
+            field = as_field(spec)
+            source = field.source or key
+            field_path = "%s.%s" % (path, source) if path else source
+            getter = 'data.getlist(%r) or _missing' if coerce and field.type is list else 'data.get(%r, _missing)'
+            lines.append('    value = %s' % (getter % source))
+            lines += self.field_lines(field, field_path, 'result[%r] = value' % key, '    ', coerce, key)
+
+        lines.append('    return result')
+        self.functions.append('\n'.join(lines))
+        return func_name
+
+    def compile_items(self, field: Field, path: str, coerce: bool) -> str:
+        self._counter += 1
+        func_name = '_items%i' % self._counter
+        lines = [
+            'def %s(values):' % func_name,
+            '    result = []',
+            '    for value in values:',
+        ]
+        lines += self.field_lines(field, path + "[]", 'result.append(value)', '        ', coerce)
+        lines.append('    return result')
+        self.functions.append('\n'.join(lines))
+        return func_name
+
+    def field_lines(self, field: Field, path: str, store: str, indent: str, coerce: bool, key: str = None) -> list:
+        lines = []
+        emit = lambda line, level=0: lines.append(indent + '    ' * level + line)
+        raise_ = lambda code, message, level: emit('raise _error(%r, %r, %r)' % (path, code, message), level)
+
+        if field.null:
+            emit('if value is _missing:')
+        else:
+            emit('if value is _missing or value is None:')
+
+        if field.required:
+            raise_('required', "Field '%s' is required", 1)
+        elif field.default is not _missing and key is not None:
+            default = self.constant(field.default)
+            emit('result[%r] = %s()' % (key, default) if callable(field.default) else 'result[%r] = %s' % (key, default), 1)
+        else:
+            emit('pass', 1)
+
+        if field.null:
+            emit('elif value is None:')
+            emit(store, 1)
+
+        emit('else:')
+        lines += self.type_lines(field, path, indent + '    ', coerce)
+
+        if field.type is str and field.required:
+            emit('if not value.strip():', 1)
+            raise_('required', "Field '%s' is required", 2)
+
+        if field.min_length is not None:
+            emit('if len(value) < %i:' % field.min_length, 1)
+            raise_('too_short', "Field '%s' is too short", 2)
+
+        if field.max_length is not None:
+            emit('if len(value) > %i:' % field.max_length, 1)
+            raise_('too_long', "Field '%s' is too long", 2)
+
+        if field.min_value is not None:
+            emit('if value < %r:' % field.min_value, 1)
+            raise_('too_small', "Field '%s' is too small", 2)
+
+        if field.max_value is not None:
+            emit('if value > %r:' % field.max_value, 1)
+            raise_('too_large', "Field '%s' is too large", 2)
+
+        if field.choices is not None:
+            emit('if value not in %s:' % self.constant(field.choices), 1)
+            raise_('invalid_choice', "Field '%s' has an invalid value", 2)
+
+        if field.schema is not None:
+            emit('value = %s(value)' % self.compile_schema(field.schema, path, coerce=False), 1)
+
+        if field.items is not None:
+            emit('value = %s(value)' % self.compile_items(field.items, path, coerce), 1)
+
+        emit(store, 1)
+        return lines
+
+    def type_lines(self, field: Field, path: str, indent: str, coerce: bool) -> list:
+        invalid = indent + '    raise _error(%r, "invalid_type", "Field \'%%s\' has an invalid type")' % path
+
+        if coerce and field.type in (int, float):
+            return [
+                indent + 'try:',
+                indent + '    value = %s(value)' % field.type.__name__,
+                indent + 'except (TypeError, ValueError):',
+                invalid,
+            ]
+
+        if coerce and field.type is bool:
+            return [
+                indent + 'value = value.lower()',
+                indent + 'if value in _true:',
+                indent + '    value = True',
+                indent + 'elif value in _false:',
+                indent + '    value = False',
+                indent + 'else:',
+                invalid,
+            ]
+
+        if field.type is float:
+            return [
+                indent + 'if value.__class__ is not float and value.__class__ is not int:',
+                invalid,
+                indent + 'value = float(value)',
+            ]
+
+        # exact class check, a bool is no valid int
+        return [
+            indent + 'if value.__class__ is not %s:' % field.type.__name__,
+            invalid,
+        ]
+
+    def build(self, func_name: str):
+        source = '\n\n'.join(self.functions)
+        exec(compile(source, '<djsonrest schema>', 'exec'), self.namespace) # pylint: disable=exec-used
+        validator = self.namespace[func_name]
+        validator.source = source
+        return validator
+
+
+def compile_schema(schema: dict, coerce: bool = False):
+    """
+    Compile a schema into a validator function.
+    The function takes the request data and returns a new dict containing only the validated (and coerced) fields.
+    Raises a djsonrest.exceptions.RequestError for the first invalid field.
+
+    :param schema: dict: The schema to compile
+    :param coerce: bool: Coerce string values to the declared types (used for query parameters)
+    """
+    compiler = _SchemaCompiler(coerce=coerce)
+    return compiler.build(compiler.compile_schema(schema))
@@ -0,0 +1,102 @@
+"""
+Warm-up of a worker process, so the first requests do not pay for lazy initialization.
+
+With settings.REST_WARMUP = True the warm-up runs when the WSGI/ASGI application is loaded (by the
+`RESTRoutesMiddleware`), so management commands do not pay for it; call `run()` yourself to warm up earlier,
+e.g. from a hook of your server. It imports the route modules of a route manifest, populates the URL resolvers,
+precomputes the version tables, CORS headers and request pipelines, loads the keys of the authentication classes,
+calls the functions of settings.REST_WARMUP_HOOKS (to prime your own caches) and connects to the databases.
+
+For preforking servers loading the application in the master process (e.g. gunicorn --preload), set
+settings.REST_WARMUP_GC_FREEZE: the databases are not connected (connections must not be shared with the workers,
+call `connect()` after forking instead) and the warmed-up objects are moved to the permanent generation of the
+garbage collector (gc.freeze()), so the workers keep sharing their memory pages copy-on-write.
+
+The readiness route (`<version>/ready`) answers 503 until the warm-up is done, if settings.REST_WARMUP is set.
+"""
+
+import gc
+import time
+import logging
+import threading
+from django.db import connections
+from django.urls import get_resolver
+from django.utils.module_loading import import_string
+from . import app_settings, rest
+
+
+_logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_done = threading.Event()
+
+
+def is_ready() -> bool:
+    """ Whether the warm-up is done or not configured """
+    return _done.is_set() or not app_settings.WARMUP
+
+
+def load_routes():
+    """ Import the modules of lazy (manifest) routes, initialize their authentication and assemble their pipelines """
+    versions = set()
+    for route in list(rest.rest_routes.values()):
+        for version_route in list(route.version_routes.values()):
+            versions.add(version_route.version.number)
+
+            for method_route in list(version_route.method_routes.values()):
+                if isinstance(method_route, rest.LazyRESTRouteVersionMethod):
+                    method_route = method_route.load()
+
+                method_route.auth.warmup()
+                method_route.build_pipeline()
+
+            version_route.cors_headers()
+
+    # the memoized version lookups of all routes for all versions of the api
+    for route in list(rest.rest_routes.values()):
+        for version in versions:
+            route.find_matching_version_route(version)
+
+
+def populate_resolvers():
+    from .handlers import RESTHandlerMixin # pylint: disable=import-outside-toplevel
+
+    for urlconf in (None, RESTHandlerMixin.urlconf):
+        get_resolver(urlconf).reverse_dict # pylint: disable=expression-not-assigned
+
+
+def connect():
+    """ Connect to all databases; call this in each worker after forking """
+    for connection in connections.all():
+        connection.ensure_connection()
+
+
+def run():
+    """
+    Warm up this process (once); returns the duration
+    """
+    with _lock:
+        if _done.is_set():
+            return 0.0
+
+        start = time.perf_counter()
+        load_routes()
+        populate_resolvers()
+
+        for hook in app_settings.WARMUP_HOOKS:
+            import_string(hook)()
+
+        if app_settings.WARMUP_GC_FREEZE:
+            connections.close_all()
+            gc.collect()
+            if hasattr(gc, 'freeze'):
+                gc.freeze()
+
+        else:
+            connect()
+
+        duration = time.perf_counter() - start
+        _done.set()
+
+    _logger.info("Warm-up of %i rest routes finished in %.1fms", len(rest.rest_routes), duration * 1000)
+    return duration